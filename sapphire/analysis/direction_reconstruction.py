@@ -19,8 +19,8 @@ import warnings
 
 from itertools import combinations
 
-from numpy import (arccos, arcsin, arctan2, array, cos, cross, dot, inf, isnan, nan, pi, sin, sqrt, sum, tan,
-                   where, zeros)
+from numpy import (arccos, arcsin, arctan2, array, asarray, clip, cos, cross, dot, inf, isnan, nan, pi, sin,
+                   sqrt, sum, tan, zeros)
 from scipy.optimize import minimize
 from scipy.sparse.csgraph import shortest_path
 from six import itervalues
@@ -31,6 +31,14 @@ from ..api import Station
 from ..simulations.showerfront import CorsikaStationFront
 from ..utils import c, floor_in_base, make_relative, memoize, norm_angle, pbar, vector_length
 
+try:
+    from numba import jit
+except ImportError:
+    def jit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
 NO_OFFSET = [0., 0., 0., 0.]
 NO_STATION_OFFSET = (0., 100.)
 
@@ -440,6 +448,134 @@ class BaseDirectionAlgorithm(object):
         return (nan, nan)
 
 
+@jit(nopython=True, error_model='numpy')
+def _rel_theta1_errorsq(theta, phi, phi1, phi2, r1, r2):
+    """Fokkema2012, eq 4.23
+
+    Combines eq 4.19-4.22 so the trigonometric terms shared by the
+    estimates are evaluated only once.
+
+    """
+    tanphi = tan(phi)
+    sinphi1 = sin(phi1)
+    cosphi1 = cos(phi1)
+    sinphi2 = sin(phi2)
+    cosphi2 = cos(phi2)
+    sintheta = sin(theta)
+    sinphiphi1 = sin(phi - phi1)
+    cosphiphi1 = cos(phi - phi1)
+
+    # eq 4.20 and 4.21
+    dphi_den = ((1 + tanphi ** 2) * r1 * r2 * sintheta *
+                (sinphi2 * cosphiphi1 - sinphi1 * cos(phi - phi2)) / c)
+    dphi_dt1 = -r2 * (sinphi2 * tanphi + cosphi2) / dphi_den
+    dphi_dt2 = r1 * (sinphi1 * tanphi + cosphi1) / dphi_den
+
+    # eq 4.22
+    aa = (r1 ** 2 * sinphi1 ** 2 +
+          r2 ** 2 * sinphi2 ** 2 -
+          r1 * r2 * sinphi1 * sinphi2)
+    bb = (2 * r1 ** 2 * sinphi1 * cosphi1 +
+          2 * r2 ** 2 * sinphi2 * cosphi2 -
+          r1 * r2 * (sinphi2 * cosphi1 + sinphi1 * cosphi2))
+    cc = (r1 ** 2 * cosphi1 ** 2 +
+          r2 ** 2 * cosphi2 ** 2 -
+          r1 * r2 * cosphi1 * cosphi2)
+    phi_errsq = 2 * (aa * tanphi ** 2 + bb * tanphi + cc) / dphi_den ** 2
+
+    den = r1 ** 2 * (1 - sintheta ** 2) * cosphiphi1 ** 2
+
+    # dphi_dt0 - dphi_dt1 = -(2 * dphi_dt1 + dphi_dt2)
+    aa = r1 ** 2 * sinphiphi1 ** 2 * phi_errsq
+    bb = 2 * r1 * c * sinphiphi1 * (2 * dphi_dt1 + dphi_dt2)
+    cc = 2 * c ** 2
+
+    return (aa * sintheta ** 2 + bb * sintheta + cc) / den
+
+
+@jit(nopython=True, error_model='numpy')
+def _rel_phi_errorsq(theta, phi, phi1, phi2, r1, r2):
+    """Fokkema2012, eq 4.22"""
+
+    tanphi = tan(phi)
+    sinphi1 = sin(phi1)
+    cosphi1 = cos(phi1)
+    sinphi2 = sin(phi2)
+    cosphi2 = cos(phi2)
+
+    den = ((1 + tanphi ** 2) ** 2 * r1 ** 2 * r2 ** 2 * sin(theta) ** 2 *
+           (sinphi1 * cos(phi - phi2) - sinphi2 * cos(phi - phi1)) ** 2 /
+           c ** 2)
+
+    aa = (r1 ** 2 * sinphi1 ** 2 +
+          r2 ** 2 * sinphi2 ** 2 -
+          r1 * r2 * sinphi1 * sinphi2)
+    bb = (2 * r1 ** 2 * sinphi1 * cosphi1 +
+          2 * r2 ** 2 * sinphi2 * cosphi2 -
+          r1 * r2 * (sinphi2 * cosphi1 + sinphi1 * cosphi2))
+    cc = (r1 ** 2 * cosphi1 ** 2 +
+          r2 ** 2 * cosphi2 ** 2 -
+          r1 * r2 * cosphi1 * cosphi2)
+
+    return 2 * (aa * tanphi ** 2 + bb * tanphi + cc) / den
+
+
+@jit(nopython=True, error_model='numpy')
+def _dphi_dt0(theta, phi, phi1, phi2, r1, r2):
+    """Fokkema2012, eq 4.19
+
+    The sum of eq 4.20 and 4.21, which share their denominator.
+
+    """
+    tanphi = tan(phi)
+    sinphi1 = sin(phi1)
+    cosphi1 = cos(phi1)
+    sinphi2 = sin(phi2)
+    cosphi2 = cos(phi2)
+
+    den = ((1 + tanphi ** 2) * r1 * r2 * sin(theta) *
+           (sinphi2 * cos(phi - phi1) - sinphi1 * cos(phi - phi2)) /
+           c)
+    num = (r2 * (sinphi2 * tanphi + cosphi2) -
+           r1 * (sinphi1 * tanphi + cosphi1))
+
+    return num / den
+
+
+@jit(nopython=True, error_model='numpy')
+def _dphi_dt1(theta, phi, phi1, phi2, r1, r2):
+    """Fokkema2012, eq 4.20"""
+
+    tanphi = tan(phi)
+    sinphi1 = sin(phi1)
+    sinphi2 = sin(phi2)
+    cosphi2 = cos(phi2)
+
+    den = ((1 + tanphi ** 2) * r1 * r2 * sin(theta) *
+           (sinphi2 * cos(phi - phi1) - sinphi1 * cos(phi - phi2)) /
+           c)
+    num = -r2 * (sinphi2 * tanphi + cosphi2)
+
+    return num / den
+
+
+@jit(nopython=True, error_model='numpy')
+def _dphi_dt2(theta, phi, phi1, phi2, r1, r2):
+    """Fokkema2012, eq 4.21"""
+
+    tanphi = tan(phi)
+    sinphi1 = sin(phi1)
+    cosphi1 = cos(phi1)
+    sinphi2 = sin(phi2)
+
+    den = ((1 + tanphi ** 2) * r1 * r2 * sin(theta) *
+           (sinphi2 * cos(phi - phi1) - sinphi1 * cos(phi - phi2)) /
+           c)
+    num = r1 * (sinphi1 * tanphi + cosphi1)
+
+    return num / den
+
+
 class DirectAlgorithm(BaseDirectionAlgorithm):
 
     """Reconstruct angles using direct analytical formula.
@@ -526,110 +662,50 @@ class DirectAlgorithm(BaseDirectionAlgorithm):
 
         return theta, phi
 
-    @classmethod
-    def rel_theta1_errorsq(cls, theta, phi, phi1, phi2, r1=10, r2=10):
+    @staticmethod
+    def rel_theta1_errorsq(theta, phi, phi1, phi2, r1=10, r2=10):
         """Fokkema2012, eq 4.23"""
 
-        sintheta = sin(theta)
-        sinphiphi1 = sin(phi - phi1)
-
-        den = r1 ** 2 * (1 - sintheta ** 2) * cos(phi - phi1) ** 2
-
-        aa = (r1 ** 2 * sinphiphi1 ** 2 *
-              cls.rel_phi_errorsq(theta, phi, phi1, phi2, r1, r2))
-        bb = -(2 * r1 * c * sinphiphi1 *
-               (cls.dphi_dt0(theta, phi, phi1, phi2, r1, r2) -
-                cls.dphi_dt1(theta, phi, phi1, phi2, r1, r2)))
-        cc = 2 * c ** 2
+        errsq = asarray(_rel_theta1_errorsq(theta, phi, phi1, phi2, r1, r2))
 
-        errsq = (aa * sintheta ** 2 + bb * sintheta + cc) / den
+        errsq[isnan(errsq)] = inf
 
-        return where(isnan(errsq), inf, errsq)
+        return errsq
 
-    @classmethod
-    def rel_theta2_errorsq(cls, theta, phi, phi1, phi2, r1=10, r2=10):
+    @staticmethod
+    def rel_theta2_errorsq(theta, phi, phi1, phi2, r1=10, r2=10):
         """Fokkema2012, eq 4.23"""
 
-        sintheta = sin(theta)
-        sinphiphi2 = sin(phi - phi2)
-
-        den = r2 ** 2 * (1 - sintheta ** 2) * cos(phi - phi2) ** 2
-
-        aa = (r2 ** 2 * sinphiphi2 ** 2 *
-              cls.rel_phi_errorsq(theta, phi, phi1, phi2, r1, r2))
-        bb = -(2 * r2 * c * sinphiphi2 *
-               (cls.dphi_dt0(theta, phi, phi1, phi2, r1, r2) -
-                cls.dphi_dt2(theta, phi, phi1, phi2, r1, r2)))
-        cc = 2 * c ** 2
+        # Equal to the error for detector 1 with both detectors swapped
+        errsq = asarray(_rel_theta1_errorsq(theta, phi, phi2, phi1, r2, r1))
 
-        errsq = (aa * sintheta ** 2 + bb * sintheta + cc) / den
+        errsq[isnan(errsq)] = inf
 
-        return where(isnan(errsq), inf, errsq)
+        return errsq
 
     @staticmethod
     def rel_phi_errorsq(theta, phi, phi1, phi2, r1=10, r2=10):
         """Fokkema2012, eq 4.22"""
 
-        tanphi = tan(phi)
-        sinphi1 = sin(phi1)
-        cosphi1 = cos(phi1)
-        sinphi2 = sin(phi2)
-        cosphi2 = cos(phi2)
-
-        den = ((1 + tanphi ** 2) ** 2 * r1 ** 2 * r2 ** 2 * sin(theta) ** 2 *
-               (sinphi1 * cos(phi - phi2) - sinphi2 * cos(phi - phi1)) ** 2 /
-               c ** 2)
-
-        aa = (r1 ** 2 * sinphi1 ** 2 +
-              r2 ** 2 * sinphi2 ** 2 -
-              r1 * r2 * sinphi1 * sinphi2)
-        bb = (2 * r1 ** 2 * sinphi1 * cosphi1 +
-              2 * r2 ** 2 * sinphi2 * cosphi2 -
-              r1 * r2 * (sinphi2 * cosphi1 + sinphi1 * cosphi2))
-        cc = (r1 ** 2 * cosphi1 ** 2 +
-              r2 ** 2 * cosphi2 ** 2 -
-              r1 * r2 * cosphi1 * cosphi2)
-
-        return 2 * (aa * tanphi ** 2 + bb * tanphi + cc) / den
+        return _rel_phi_errorsq(theta, phi, phi1, phi2, r1, r2)
 
     @classmethod
     def dphi_dt0(cls, theta, phi, phi1, phi2, r1=10, r2=10):
         """Fokkema2012, eq 4.19"""
 
-        return -(cls.dphi_dt1(theta, phi, phi1, phi2, r1, r2) +
-                 cls.dphi_dt2(theta, phi, phi1, phi2, r1, r2))
+        return _dphi_dt0(theta, phi, phi1, phi2, r1, r2)
 
     @staticmethod
     def dphi_dt1(theta, phi, phi1, phi2, r1=10, r2=10):
         """Fokkema2012, eq 4.20"""
 
-        tanphi = tan(phi)
-        sinphi1 = sin(phi1)
-        sinphi2 = sin(phi2)
-        cosphi2 = cos(phi2)
-
-        den = ((1 + tanphi ** 2) * r1 * r2 * sin(theta) *
-               (sinphi2 * cos(phi - phi1) - sinphi1 * cos(phi - phi2)) /
-               c)
-        num = -r2 * (sinphi2 * tanphi + cosphi2)
-
-        return num / den
+        return _dphi_dt1(theta, phi, phi1, phi2, r1, r2)
 
     @staticmethod
     def dphi_dt2(theta, phi, phi1, phi2, r1=10, r2=10):
         """Fokkema2012, eq 4.21"""
 
-        tanphi = tan(phi)
-        sinphi1 = sin(phi1)
-        cosphi1 = cos(phi1)
-        sinphi2 = sin(phi2)
-
-        den = ((1 + tanphi ** 2) * r1 * r2 * sin(theta) *
-               (sinphi2 * cos(phi - phi1) - sinphi1 * cos(phi - phi2)) /
-               c)
-        num = r1 * (sinphi1 * tanphi + cosphi1)
-
-        return num / den
+        return _dphi_dt2(theta, phi, phi1, phi2, r1, r2)
 
 
 class DirectAlgorithmCartesian(BaseDirectionAlgorithm):
@@ -769,17 +845,12 @@ class DirectAlgorithmCartesian3D(BaseDirectionAlgorithm):
             nplus = (uxv + term) / vsquared
             nmin = (uxv - term) / vsquared
 
+            # Clip round-off errors which would make arccos return NaN
             phiplus = arctan2(nplus[1], nplus[0])
-            thetaplus = arccos(nplus[2])
+            thetaplus = arccos(clip(nplus[2], -1, 1))
 
             phimin = arctan2(nmin[1], nmin[0])
-            thetamin = arccos(nmin[2])
-
-            if isnan(thetaplus):
-                thetaplus = pi
-
-            if isnan(thetamin):
-                thetamin = pi
+            thetamin = arccos(clip(nmin[2], -1, 1))
 
             # Allow solution only if it is the only one above horizon
             if thetaplus <= pi / 2. and thetamin > pi / 2.:
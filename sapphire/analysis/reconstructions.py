@@ -25,10 +25,12 @@ import warnings
 
 import tables
 
-from six.moves import zip, zip_longest
+from numpy import array, inf, nan, where, zeros
+from six.moves import zip
 
 from .. import api
 from ..clusters import HiSPARCStations, Station
+from ..esd import FILTERS
 from ..storage import ReconstructedCoincidence, ReconstructedEvent
 from ..utils import pbar
 from .calibration import determine_detector_timing_offsets
@@ -160,7 +162,7 @@ class ReconstructESDEvents(object):
                                    self.station_group)
         self.reconstructions = self.data.create_table(
             self.station_group, self.destination, ReconstructedEvent,
-            expectedrows=self.events.nrows)
+            expectedrows=self.events.nrows, filters=FILTERS)
         try:
             self.reconstructions._v_attrs.station = self.station
         except tables.HDF5ExtError:
@@ -221,41 +223,31 @@ class ReconstructESDEvents(object):
         self.detector_offsets.flush()
 
     def store_reconstructions(self):
-        """Loop over list of reconstructed data and store results
+        """Store the reconstructed data
 
         Unsuccessful reconstructions are also stored but with the NumPy
-        NaN as reconstructed value.
+        NaN as reconstructed value.  All rows are written with a single
+        append.
 
         """
-        for event, core_x, core_y, theta, phi, detector_ids in zip_longest(
-                self.events, self.core_x, self.core_y,
-                self.theta, self.phi, self.detector_ids):
-            self._store_reconstruction(event, core_x, core_y, theta, phi,
-                                       detector_ids)
+        rows = _new_reconstruction_rows(self.reconstructions,
+                                        self.events.nrows, self.core_x,
+                                        self.core_y, self.theta, self.phi)
+        rows['id'] = self.events.col('event_id')
+        rows['ext_timestamp'] = self.events.col('ext_timestamp')
+        used = zeros((len(rows), 4), dtype=bool)
+        for i, detector_ids in enumerate(self.detector_ids):
+            used[i, list(detector_ids)] = True
+        n = array([self.events.col('n%d' % (id + 1)) for id in range(4)]).T
+        rows['min_n'] = where(used, n, inf).min(axis=1)
+        # sometimes, all arrival times are -999 or -1, and then
+        # detector_ids = [].
+        rows['min_n'][~used.any(axis=1)] = -999.
+        for id in range(4):
+            rows['d%d' % (id + 1)] = used[:, id]
+        self.reconstructions.append(rows)
         self.reconstructions.flush()
 
-    def _store_reconstruction(self, event, core_x, core_y, theta, phi,
-                              detector_ids):
-        """Store single reconstruction"""
-
-        row = self.reconstructions.row
-        row['id'] = event['event_id']
-        row['ext_timestamp'] = event['ext_timestamp']
-        try:
-            row['min_n'] = min([event['n%d' % (id + 1)] for id in
-                                detector_ids])
-        except ValueError:
-            # sometimes, all arrival times are -999 or -1, and then
-            # detector_ids = []. So min([]) gives a ValueError.
-            row['min_n'] = -999.
-        row['x'] = core_x
-        row['y'] = core_y
-        row['zenith'] = theta
-        row['azimuth'] = phi
-        for id in detector_ids:
-            row['d%d' % (id + 1)] = True
-        row.append()
-
     def _get_or_create_station_object(self, station):
             if isinstance(station, Station):
                 self.station = station
@@ -314,7 +306,8 @@ class ReconstructESDEventsFromSource(ReconstructESDEvents):
                                    self.dest_group)
         self.reconstructions = self.dest_data.create_table(
             self.dest_group, self.destination, ReconstructedEvent,
-            expectedrows=self.events.nrows, createparents=True)
+            expectedrows=self.events.nrows, createparents=True,
+            filters=FILTERS)
         try:
             self.reconstructions._v_attrs.station = self.station
         except tables.HDF5ExtError:
@@ -495,7 +488,7 @@ class ReconstructESDCoincidences(object):
         description.columns.update(s_columns)
         self.reconstructions = self.data.create_table(
             self.coincidences_group, self.destination, description,
-            expectedrows=self.coincidences.nrows)
+            expectedrows=self.coincidences.nrows, filters=FILTERS)
         try:
             self.reconstructions._v_attrs.cluster = self.cluster
         except tables.HDF5ExtError:
@@ -526,44 +519,27 @@ class ReconstructESDCoincidences(object):
                 print('Using timing offsets from public database.')
 
     def store_reconstructions(self):
-        """Loop over list of reconstructed data and store results
+        """Store the reconstructed data
 
         Unsuccessful reconstructions are also stored but with the NumPy
-        NaN as reconstructed value.
+        NaN as reconstructed value.  All rows are written with a single
+        append.
 
         """
-        for coincidence, x, y, theta, phi, station_numbers in zip_longest(
-                self.coincidences, self.core_x, self.core_y,
-                self.theta, self.phi, self.station_numbers):
-            self._store_reconstruction(coincidence, x, y, theta, phi,
-                                       station_numbers)
+        coincidences = self.coincidences.read()
+        rows = _new_reconstruction_rows(self.reconstructions,
+                                        len(coincidences), self.core_x,
+                                        self.core_y, self.theta, self.phi)
+        rows['id'] = coincidences['id']
+        rows['ext_timestamp'] = coincidences['ext_timestamp']
+        for key in ['x', 'y', 'zenith', 'azimuth', 'size', 'energy']:
+            rows['reference_' + key] = coincidences[key]
+        for i, station_numbers in enumerate(self.station_numbers):
+            for number in station_numbers:
+                rows['s%d' % number][i] = True
+        self.reconstructions.append(rows)
         self.reconstructions.flush()
 
-    def _store_reconstruction(self, coincidence, core_x, core_y, theta, phi,
-                              station_numbers):
-        """Store single reconstruction"""
-
-        row = self.reconstructions.row
-
-        row['id'] = coincidence['id']
-        row['ext_timestamp'] = coincidence['ext_timestamp']
-        row['x'] = core_x
-        row['y'] = core_y
-        row['zenith'] = theta
-        row['azimuth'] = phi
-
-        row['reference_x'] = coincidence['x']
-        row['reference_y'] = coincidence['y']
-        row['reference_zenith'] = coincidence['zenith']
-        row['reference_azimuth'] = coincidence['azimuth']
-        row['reference_size'] = coincidence['size']
-        row['reference_energy'] = coincidence['energy']
-
-        for number in station_numbers:
-            row['s%d' % number] = True
-
-        row.append()
-
     def _get_or_create_cluster_object(self, cluster):
         """Create cluster object from public database"""
 
@@ -645,7 +621,8 @@ class ReconstructESDCoincidencesFromSource(ReconstructESDCoincidences):
         description.columns.update(s_columns)
         self.reconstructions = self.dest_data.create_table(
             self.dest_group, self.destination, description,
-            expectedrows=self.coincidences.nrows, createparents=True)
+            expectedrows=self.coincidences.nrows, createparents=True,
+            filters=FILTERS)
         try:
             self.reconstructions._v_attrs.cluster = self.cluster
         except tables.HDF5ExtError:
@@ -702,3 +679,23 @@ class ReconstructSimulatedCoincidences(ReconstructESDCoincidences):
             if self.verbose:
                 print('Using cluster %s for metadata.' % self.cluster)
         return cluster
+
+
+def _new_reconstruction_rows(table, n_rows, core_x, core_y, theta, phi):
+    """Create an array of rows for a reconstructions table
+
+    Columns which are not given default to zero (False).  Missing
+    reconstructed values are filled with NaN.
+
+    :param table: the reconstructions table.
+    :param n_rows: the number of rows.
+    :param core_x,core_y,theta,phi: reconstructed values.
+    :return: structured array with the dtype of the table.
+
+    """
+    rows = zeros(n_rows, dtype=table.dtype)
+    for key, values in [('x', core_x), ('y', core_y), ('zenith', theta),
+                        ('azimuth', phi)]:
+        rows[key] = nan
+        rows[key][:len(values)] = values
+    return rows
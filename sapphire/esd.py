@@ -14,19 +14,17 @@
 """
 import calendar
 import collections
-import csv
 import datetime
+import io
 import itertools
-import os.path
+import os
 import re
 import time
 
-from codecs import iterdecode
-
 import tables
 
+from numpy import arange, array, zeros
 from progressbar import ETA, Bar, Percentage, ProgressBar
-from six import itervalues
 from six.moves.http_client import BadStatusLine
 from six.moves.urllib.parse import urlencode
 from six.moves.urllib.request import urlopen
@@ -40,6 +38,26 @@ SINGLES_URL = BASE + '{station_number:d}/singles/?{query}'
 LIGHTNING_URL = BASE + 'knmi/lightning/{lightning_type:d}/?{query}'
 COINCIDENCES_URL = BASE + 'network/coincidences/?{query}'
 
+# Station number at the end of a (bytes) station group path
+_STATION_NUMBER_RE = re.compile(b'[0-9]+$')
+
+# Compression for the (mostly numeric) data tables.  Byte shuffling makes
+# the columns compress well and LZ4 keeps (de)compression cheap compared to
+# reading and parsing the data.  Also used for reconstructions.
+FILTERS = tables.Filters(complevel=5, complib='blosc:lz4', shuffle=True)
+
+# Number of TSV lines to collect before converting and storing them
+BATCH_SIZE = 10000
+
+# Nanoseconds per second, to combine timestamp and nanoseconds
+_NS_PER_S = 1000000000
+
+# Buffer size for reading TSV data in large blocks instead of line by line
+_BUFFER_SIZE = 1 << 20
+
+# Number of lines or coincidences between checks for a progressbar update
+_PROGRESS_CHECK_INTERVAL = 4096
+
 
 def quick_download(station_number, date=None):
     """Quickly download some data
@@ -72,15 +90,22 @@ def quick_download(station_number, date=None):
     return data
 
 
-def _first_available_numbered_path():
+def _first_available_numbered_path(directory=None):
     """Find first available file name in sequence
 
     If data1.h5 is taken, return data2.h5, etc.
 
+    :param directory: directory in which to look for a free name, if not
+                      given the current working directory is used.
+
     """
+    existing = set(os.listdir(directory or os.curdir))
     path = 'data%d.h5'
-    return next(path % idx for idx in itertools.count(start=1)
-                if not os.path.exists(path % idx))
+    name = next(path % idx for idx in itertools.count(start=1)
+                if path % idx not in existing)
+    if directory is None:
+        return name
+    return os.path.join(directory, name)
 
 
 def load_data(file, group, tsv_file, type='events'):
@@ -106,23 +131,14 @@ def load_data(file, group, tsv_file, type='events'):
         >>> sapphire.esd.load_data(data, '/s501', 'events-s501-20130910.tsv')
 
     """
-    if type == 'events':
-        table = _get_or_create_events_table(file, group)
-        read_and_store_class = _read_line_and_store_event_class
-    elif type == 'weather':
-        table = _get_or_create_weather_table(file, group)
-        read_and_store_class = _read_line_and_store_weather_class
-    elif type == 'singles':
-        table = _get_or_create_singles_table(file, group)
-        read_and_store_class = _read_line_and_store_singles_class
-    elif type == 'lightning':
-        table = _get_or_create_lightning_table(file, group)
-        read_and_store_class = _read_line_and_store_lightning_class
-    else:
+    try:
+        _, get_or_create_table, read_and_store_class = _DATA_TYPES[type]
+    except KeyError:
         raise ValueError("Data type not recognized.")
+    table = get_or_create_table(file, group)
 
-    with open(tsv_file, 'rb') as data:
-        reader = csv.reader(iterdecode(data, 'utf-8'), delimiter='\t')
+    with open(tsv_file, 'rb', buffering=_BUFFER_SIZE) as data:
+        reader = _tsv_lines(data)
         with read_and_store_class(table) as writer:
             for line in reader:
                 writer.store_line(line)
@@ -177,24 +193,14 @@ def download_data(file, group, station_number, start=None, end=None,
 
     # build and open url, create tables and set read function
     query = urlencode({'start': start, 'end': end})
-    if type == 'events':
-        url = EVENTS_URL.format(station_number=station_number, query=query)
-        table = _get_or_create_events_table(file, group)
-        read_and_store = _read_line_and_store_event_class
-    elif type == 'weather':
-        url = WEATHER_URL.format(station_number=station_number, query=query)
-        table = _get_or_create_weather_table(file, group)
-        read_and_store = _read_line_and_store_weather_class
-    elif type == 'singles':
-        url = SINGLES_URL.format(station_number=station_number, query=query)
-        table = _get_or_create_singles_table(file, group)
-        read_and_store = _read_line_and_store_singles_class
-    elif type == 'lightning':
-        url = LIGHTNING_URL.format(lightning_type=station_number, query=query)
-        table = _get_or_create_lightning_table(file, group)
-        read_and_store = _read_line_and_store_lightning_class
-    else:
+    try:
+        url, get_or_create_table, read_and_store = _DATA_TYPES[type]
+    except KeyError:
         raise ValueError("Data type not recognized.")
+    # for lightning data the station number is the lightning type
+    url = url.format(station_number=station_number,
+                     lightning_type=station_number, query=query)
+    table = get_or_create_table(file, group)
 
     try:
         data = urlopen(url)
@@ -213,19 +219,21 @@ def download_data(file, group, station_number, start=None, end=None,
 
     # loop over lines in tsv as they come streaming in
     prev_update = time.time()
-    reader = csv.reader(iterdecode(data, 'utf-8'), delimiter='\t')
+    reader = _tsv_lines(io.BufferedReader(data, _BUFFER_SIZE))
     with read_and_store(table) as writer:
-        for line in reader:
+        for line_number, line in enumerate(reader):
             timestamp = writer.store_line(line)
-            # update progressbar every 0.5 seconds
-            if (progress and time.time() - prev_update > 0.5 and
+            # update progressbar every 0.5 seconds, only check the time
+            # every so many lines
+            if (progress and not line_number % _PROGRESS_CHECK_INTERVAL and
+                    time.time() - prev_update > 0.5 and
                     not timestamp == 0.):
                 pbar.update((1. * timestamp - t_start) / t_delta)
                 prev_update = time.time()
     if progress:
         pbar.finish()
 
-    if line[0][0] == '#':
+    if line[0].startswith(b'#'):
         if len(line[0]) == 1:
             # No events recieved, and no success line
             raise Exception('Failed to download data, no data recieved.')
@@ -235,7 +243,7 @@ def download_data(file, group, station_number, start=None, end=None,
     else:
         # Last line is data, report failed download and date/time of last line
         raise Exception('Failed to complete download, last received data '
-                        'from: %s %s.' % tuple(line[:2]))
+                        'from: %s.' % b' '.join(line[:2]).decode())
 
 
 def download_lightning(file, group, lightning_type=4, start=None, end=None,
@@ -297,31 +305,39 @@ def load_coincidences(file, tsv_file, group=''):
     station_groups = _read_or_get_station_groups(file, group)
     c_group = _get_or_create_coincidences_tables(file, group, station_groups)
 
-    with open(tsv_file, 'rb') as data:
+    with open(tsv_file, 'rb', buffering=_BUFFER_SIZE) as data:
         # loop over lines in tsv as they come streaming in, keep temporary
         # lists until a full coincidence is in.
-        reader = csv.reader(iterdecode(data, 'utf-8'), delimiter='\t')
+        reader = _tsv_lines(data)
         current_coincidence = 0
         coincidence = []
-        for line in reader:
-            if line[0][0] == '#':
-                continue
-            elif int(line[0]) == current_coincidence:
-                coincidence.append(line)
-            else:
-                # Full coincidence has been received, store it.
-                _read_lines_and_store_coincidence(file, c_group,
-                                                  coincidence, station_groups)
-                coincidence = [line]
-                current_coincidence = int(line[0])
-                file.flush()
-
-        if len(coincidence):
-            # Store last coincidence
-            _read_lines_and_store_coincidence(file, c_group, coincidence,
-                                              station_groups)
+        writers = {}
+        try:
+            for line in reader:
+                if line[0].startswith(b'#'):
+                    continue
+                coincidence_id = int(line[0])
+                if coincidence_id == current_coincidence:
+                    coincidence.append(line)
+                else:
+                    # Full coincidence has been received, store it.
+                    _read_lines_and_store_coincidence(file, c_group, coincidence,
+                                                      station_groups, writers)
+                    coincidence = [line]
+                    current_coincidence = coincidence_id
+
+            if len(coincidence):
+                # Store last coincidence
+                _read_lines_and_store_coincidence(file, c_group, coincidence,
+                                                  station_groups, writers)
+        finally:
+            # Also store the collected events if reading is interrupted,
+            # because the coincidence index already refers to them.
+            for writer in writers.values():
+                writer.flush()
+        file.flush()
 
-        if line[0][0] == '#':
+        if line[0].startswith(b'#'):
             if len(line[0]) == 1:
                 # No events to load, and no success line
                 raise Exception('No data to load, source contains no data.')
@@ -331,9 +347,7 @@ def load_coincidences(file, tsv_file, group=''):
         else:
             # Last line is data, report possible fail and last date/time
             raise Exception('Source file seems incomplete, last received data '
-                            'from: %s %s.' % tuple(line[2:4]))
-
-        file.flush()
+                            'from: %s.' % b' '.join(line[2:4]).decode())
 
 
 def download_coincidences(file, group='', cluster=None, stations=None,
@@ -408,36 +422,48 @@ def download_coincidences(file, group='', cluster=None, stations=None,
     # loop over lines in tsv as they come streaming in, keep temporary
     # lists until a full coincidence is in.
     prev_update = time.time()
-    reader = csv.reader(iterdecode(data, 'utf-8'), delimiter='\t')
+    reader = _tsv_lines(io.BufferedReader(data, _BUFFER_SIZE))
     current_coincidence = 0
     coincidence = []
-    for line in reader:
-        if line[0][0] == '#':
-            continue
-        elif int(line[0]) == current_coincidence:
-            coincidence.append(line)
-        else:
-            # Full coincidence has been received, store it.
-            timestamp = _read_lines_and_store_coincidence(file, c_group,
-                                                          coincidence,
-                                                          station_groups)
-            # update progressbar every 0.5 seconds
-            if (progress and time.time() - prev_update > 0.5 and
-                    not timestamp == 0.):
-                pbar.update((1. * timestamp - t_start) / t_delta)
-                prev_update = time.time()
-            coincidence = [line]
-            current_coincidence = int(line[0])
-            file.flush()
-
-    if len(coincidence):
-        # Store last coincidence
-        _read_lines_and_store_coincidence(file, c_group, coincidence,
-                                          station_groups)
+    writers = {}
+    try:
+        for line in reader:
+            if line[0].startswith(b'#'):
+                continue
+            coincidence_id = int(line[0])
+            if coincidence_id == current_coincidence:
+                coincidence.append(line)
+            else:
+                # Full coincidence has been received, store it.
+                timestamp = _read_lines_and_store_coincidence(file, c_group,
+                                                              coincidence,
+                                                              station_groups,
+                                                              writers)
+                # update progressbar every 0.5 seconds, only check the time
+                # every so many coincidences
+                if (progress and
+                        not coincidence_id % _PROGRESS_CHECK_INTERVAL and
+                        time.time() - prev_update > 0.5 and
+                        not timestamp == 0.):
+                    pbar.update((1. * timestamp - t_start) / t_delta)
+                    prev_update = time.time()
+                coincidence = [line]
+                current_coincidence = coincidence_id
+
+        if len(coincidence):
+            # Store last coincidence
+            _read_lines_and_store_coincidence(file, c_group, coincidence,
+                                              station_groups, writers)
+    finally:
+        # Also store the collected events if reading is interrupted,
+        # because the coincidence index already refers to them.
+        for writer in writers.values():
+            writer.flush()
+    file.flush()
     if progress:
         pbar.finish()
 
-    if line[0][0] == '#':
+    if line[0].startswith(b'#'):
         if len(line[0]) == 1:
             # No events recieved, and no success line
             raise Exception('Failed to download data, no data recieved.')
@@ -447,9 +473,7 @@ def download_coincidences(file, group='', cluster=None, stations=None,
     else:
         # Last line is data, report failed download and date/time of last line
         raise Exception('Failed to complete download, last received data '
-                        'from: %s %s.' % tuple(line[2:4]))
-
-    file.flush()
+                        'from: %s.' % b' '.join(line[2:4]).decode())
 
 
 def _read_or_get_station_groups(file, group):
@@ -466,12 +490,10 @@ def _read_or_get_station_groups(file, group):
     except tables.NoSuchNodeError:
         return _get_station_groups(group)
     else:
-        re_number = re.compile('[0-9]+$')
         groups = collections.OrderedDict()
         for sid, station_group in enumerate(s_index):
-            station_group = station_group.decode()
-            station = int(re_number.search(station_group).group())
-            groups[station] = {'group': station_group,
+            station = int(_STATION_NUMBER_RE.search(station_group).group())
+            groups[station] = {'group': station_group.decode(),
                                's_index': sid}
         return groups
 
@@ -526,14 +548,15 @@ def _create_coincidences_tables(file, group, station_groups):
                  for p, station in enumerate(station_groups, 12)}
     description.columns.update(s_columns)
     coincidences = file.create_table(coin_group, 'coincidences', description,
-                                     createparents=True)
+                                     createparents=True, filters=FILTERS)
 
     # Create c_index
-    file.create_vlarray(coin_group, 'c_index', tables.UInt32Col(shape=2))
+    file.create_vlarray(coin_group, 'c_index', tables.UInt32Col(shape=2),
+                        filters=FILTERS)
 
     # Create and fill s_index
     s_index = file.create_vlarray(coin_group, 's_index', tables.VLStringAtom())
-    for station_group in itervalues(station_groups):
+    for station_group in station_groups.values():
         s_index.append(station_group['group'].encode('utf-8'))
 
     return coincidences._v_parent
@@ -575,7 +598,8 @@ def _create_events_table(file, group):
                    't4': tables.Float32Col(pos=13),
                    't_trigger': tables.Float32Col(pos=14)}
 
-    return file.create_table(group, 'events', description, createparents=True)
+    return file.create_table(group, 'events', description, createparents=True,
+                             filters=FILTERS)
 
 
 def _get_or_create_weather_table(file, group):
@@ -615,7 +639,8 @@ def _create_weather_table(file, group):
                    'dew_point': tables.Float32Col(pos=14),
                    'wind_chill': tables.Float32Col(pos=15)}
 
-    return file.create_table(group, 'weather', description, createparents=True)
+    return file.create_table(group, 'weather', description, createparents=True,
+                             filters=FILTERS)
 
 
 def _get_or_create_singles_table(file, group):
@@ -648,7 +673,8 @@ def _create_singles_table(file, group):
                    'slv_ch1_high': tables.Int32Col(pos=7),
                    'slv_ch2_low': tables.Int32Col(pos=8),
                    'slv_ch2_high': tables.Int32Col(pos=9)}
-    return file.create_table(group, 'singles', description, createparents=True)
+    return file.create_table(group, 'singles', description, createparents=True,
+                             filters=FILTERS)
 
 
 def _get_or_create_lightning_table(file, group):
@@ -680,11 +706,11 @@ def _create_lightning_table(file, group):
                    'current': tables.Float32Col(pos=6)}
 
     return file.create_table(group, 'lightning', description,
-                             createparents=True)
+                             createparents=True, filters=FILTERS)
 
 
 def _read_lines_and_store_coincidence(file, c_group, coincidence,
-                                      station_groups):
+                                      station_groups, writers):
     """Read TSV lines and store coincidence
 
     Read lines from the TSV download and store the coincidence and events.
@@ -694,18 +720,24 @@ def _read_lines_and_store_coincidence(file, c_group, coincidence,
     :param c_group: the coincidences group.
     :param coincidence: text lines from the TSV file for one coincidence.
     :param station_groups: dictionary to find the path to a station_group.
+    :param writers: dictionary with an event writer per station number, new
+                    writers are added when needed.
     :return: coincidence timestamp.
 
     """
     c_idx = []
+    timestamp = int(coincidence[0][4])
+    nanoseconds = int(coincidence[0][5])
     coincidences = file.get_node(c_group, 'coincidences')
+    c_index = file.get_node(c_group, 'c_index')
     row = coincidences.row
-    row['id'] = len(coincidences)
+    # Rows in the coincidences table are buffered, but each coincidence is
+    # directly written to c_index, so use that to count the coincidences.
+    row['id'] = len(c_index)
     row['N'] = len(coincidence)
-    row['timestamp'] = int(coincidence[0][4])
-    row['nanoseconds'] = int(coincidence[0][5])
-    row['ext_timestamp'] = (int(coincidence[0][4]) * int(1e9) +
-                            int(coincidence[0][5]))
+    row['timestamp'] = timestamp
+    row['nanoseconds'] = nanoseconds
+    row['ext_timestamp'] = timestamp * _NS_PER_S + nanoseconds
 
     for event in coincidence:
         station_number = int(event[1])
@@ -716,18 +748,44 @@ def _read_lines_and_store_coincidence(file, c_group, coincidence,
             # Can not add new column, so user should make a new data file.
             raise Exception('Unexpected station number: %d, no column and/or '
                             'station group path available.' % station_number)
-        event_group = _get_or_create_events_table(file, group_path)
-        with _read_line_and_store_event_class(event_group) as writer:
-            s_idx = station_groups[station_number]['s_index']
-            e_idx = len(event_group)
-            c_idx.append((s_idx, e_idx))
-            writer.store_line(event[2:])
+        if station_number not in writers:
+            event_group = _get_or_create_events_table(file, group_path)
+            writers[station_number] = \
+                _read_line_and_store_event_class(event_group)
+        writer = writers[station_number]
+        s_idx = station_groups[station_number]['s_index']
+        e_idx = writer.n_rows
+        c_idx.append((s_idx, e_idx))
+        writer.store_line(event[2:])
 
     row.append()
-    c_index = file.get_node(c_group, 'c_index')
     c_index.append(c_idx)
 
-    return int(coincidence[0][4])
+    return timestamp
+
+
+def _tsv_lines(data):
+    """Split the lines of a binary TSV stream into columns
+
+    The data is only ASCII, so the columns are kept as bytes.
+
+    :param data: binary file-like object, like an HTTP response.
+    :return: generator of lists with the bytes of each column.
+
+    """
+    for line in data:
+        yield line.rstrip(b'\r\n').split(b'\t')
+
+
+def _ext_timestamps(timestamps, nanoseconds):
+    """Combine arrays of timestamps and nanoseconds to ext_timestamps
+
+    :param timestamps: array of timestamps in seconds.
+    :param nanoseconds: array of nanoseconds within the second.
+    :return: array of ext_timestamps in nanoseconds.
+
+    """
+    return timestamps.astype('u8') * _NS_PER_S + nanoseconds.astype('u8')
 
 
 class _read_line_and_store_event_class(object):
@@ -735,15 +793,19 @@ class _read_line_and_store_event_class(object):
     """Store lines of event data from the ESD
 
     Use this contextmanager to store events from a TSV file into a PyTables
-    table.
+    table.  Lines are collected and converted to table rows in batches.
 
     :param table: a PyTables Table object in which to store the data.
 
     """
 
+    #: number of TSV columns used
+    n_columns = 23
+
     def __init__(self, table):
         self.table = table
         self.event_counter = len(self.table)
+        self.lines = []
 
     def __enter__(self):
         return self
@@ -751,170 +813,132 @@ class _read_line_and_store_event_class(object):
     def store_line(self, line):
         """Store a single line
 
-        :param line: the line to store as a tuple of strings (one element
+        :param line: the line to store as a list of bytes (one element
                      per column).
         :return: timestamp of the stored event, or 0 if the given line was a
                  comment line starting with a '#'.
 
         """
         # ignore comment lines
-        if line[0][0] == '#':
+        if line[0].startswith(b'#'):
             return 0.
 
-        # break up TSV line
-        (date, time_str, timestamp, nanoseconds, ph1, ph2, ph3, ph4, int1,
-         int2, int3, int4, n1, n2, n3, n4, t1, t2, t3, t4, t_trigger, zenith,
-         azimuth) = line[:23]
-
-        row = self.table.row
-
-        # convert string values to correct data types or calculate values
-        row['event_id'] = self.event_counter
-        row['timestamp'] = int(timestamp)
-        row['nanoseconds'] = int(nanoseconds)
-        row['ext_timestamp'] = int(timestamp) * int(1e9) + int(nanoseconds)
-        row['pulseheights'] = [int(ph1), int(ph2), int(ph3), int(ph4)]
-        row['integrals'] = [int(int1), int(int2), int(int3), int(int4)]
-        row['n1'] = float(n1)
-        row['n2'] = float(n2)
-        row['n3'] = float(n3)
-        row['n4'] = float(n4)
-        row['t1'] = float(t1)
-        row['t2'] = float(t2)
-        row['t3'] = float(t3)
-        row['t4'] = float(t4)
-        row['t_trigger'] = float(t_trigger)
-
-        # store event
-        row.append()
-
-        self.event_counter += 1
-        # force flush every 1e6 rows to free buffers
-        if not self.event_counter % 1000000:
-            self.table.flush()
-
-        return int(timestamp)
+        self.lines.append(line[:self.n_columns])
+        if len(self.lines) >= BATCH_SIZE:
+            self.store_lines()
 
-    def __exit__(self, type, value, traceback):
-        self.table.flush()
+        return int(line[2])
 
+    def store_lines(self):
+        """Convert and store all collected lines at once"""
 
-class _read_line_and_store_weather_class(_read_line_and_store_event_class):
-
-    """Store lines of weather data from the ESD"""
-
-    def store_line(self, line):
-        # ignore comment lines
-        if line[0][0] == '#':
-            return 0.
+        if not len(self.lines):
+            return
 
-        # break up TSV line
-        (date, time, timestamp, temperature_inside, temperature_outside,
-         humidity_inside, humidity_outside, atmospheric_pressure,
-         wind_direction, wind_speed, solar_radiation, uv_index,
-         evapotranspiration, rain_rate, heat_index, dew_point,
-         wind_chill) = line
-
-        row = self.table.row
-
-        # convert string values to correct data types
-        row['event_id'] = self.event_counter
-        row['timestamp'] = int(timestamp)
-        row['temp_inside'] = float(temperature_inside)
-        row['temp_outside'] = float(temperature_outside)
-        row['humidity_inside'] = int(humidity_inside)
-        row['humidity_outside'] = int(humidity_outside)
-        row['barometer'] = float(atmospheric_pressure)
-        row['wind_dir'] = int(wind_direction)
-        row['wind_speed'] = int(wind_speed)
-        row['solar_rad'] = int(solar_radiation)
-        row['uv'] = int(uv_index)
-        row['evapotranspiration'] = float(evapotranspiration)
-        row['rain_rate'] = float(rain_rate)
-        row['heat_index'] = int(heat_index)
-        row['dew_point'] = float(dew_point)
-        row['wind_chill'] = float(wind_chill)
-
-        # store event
-        row.append()
-
-        self.event_counter += 1
-        # force flush every 1e6 rows to free buffers
-        if not self.event_counter % 1000000:
-            self.table.flush()
-
-        return int(timestamp)
+        lines = array(self.lines)
+        n_lines = len(lines)
 
+        rows = zeros(n_lines, dtype=self.table.dtype)
+        rows['event_id'] = arange(self.event_counter,
+                                  self.event_counter + n_lines)
+        rows['timestamp'] = lines[:, 2].astype(int)
+        self.convert_lines(lines, rows)
 
-class _read_line_and_store_singles_class(_read_line_and_store_event_class):
+        self.table.append(rows)
+        self.event_counter += n_lines
+        self.lines = []
 
-    """Store lines of singles data from the ESD"""
+    def convert_lines(self, lines, rows):
+        """Convert the columns of the lines to the table columns
 
-    def store_line(self, line):
-        # ignore comment lines
-        if line[0][0] == '#':
-            return 0.
+        :param lines: array of strings, one row per line.
+        :param rows: array with the dtype of the table to fill.
 
-        # break up TSV line
-        (date, time, timestamp,
-         mas_ch1_low, mas_ch1_high, mas_ch2_low, mas_ch2_high,
-         slv_ch1_low, slv_ch1_high, slv_ch2_low, slv_ch2_high) = line
+        """
+        # columns: date, time, timestamp, nanoseconds, ph1-4, int1-4, n1-4,
+        # t1-4, t_trigger, zenith, azimuth
+        nanoseconds = lines[:, 3].astype(int)
+        rows['nanoseconds'] = nanoseconds
+        rows['ext_timestamp'] = _ext_timestamps(rows['timestamp'], nanoseconds)
+        rows['pulseheights'] = lines[:, 4:8].astype(int)
+        rows['integrals'] = lines[:, 8:12].astype(int)
+        for idx, column in enumerate(['n1', 'n2', 'n3', 'n4', 't1', 't2',
+                                      't3', 't4', 't_trigger'], 12):
+            rows[column] = lines[:, idx].astype(float)
+
+    @property
+    def n_rows(self):
+        """Number of rows in the table, including those not yet stored"""
+
+        return self.event_counter + len(self.lines)
+
+    def flush(self):
+        """Store the remaining lines and flush the table"""
+
+        self.store_lines()
+        self.table.flush()
 
-        row = self.table.row
+    def __exit__(self, type, value, traceback):
+        self.flush()
 
-        # convert string values to correct data types
-        row['event_id'] = self.event_counter
-        row['timestamp'] = int(timestamp)
-        row['mas_ch1_low'] = int(mas_ch1_low)
-        row['mas_ch1_high'] = int(mas_ch1_high)
-        row['mas_ch2_low'] = int(mas_ch2_low)
-        row['mas_ch2_high'] = int(mas_ch2_high)
-        row['slv_ch1_low'] = int(slv_ch1_low)
-        row['slv_ch1_high'] = int(slv_ch1_high)
-        row['slv_ch2_low'] = int(slv_ch2_low)
-        row['slv_ch2_high'] = int(slv_ch2_high)
 
-        # store event
-        row.append()
+class _read_line_and_store_weather_class(_read_line_and_store_event_class):
 
-        self.event_counter += 1
-        # force flush every 1e6 rows to free buffers
-        if not self.event_counter % 1000000:
-            self.table.flush()
+    """Store lines of weather data from the ESD"""
 
-        return int(timestamp)
+    n_columns = 17
 
+    def convert_lines(self, lines, rows):
+        # columns: date, time, timestamp, followed by the weather columns
+        columns = [('temp_inside', float), ('temp_outside', float),
+                   ('humidity_inside', int), ('humidity_outside', int),
+                   ('barometer', float), ('wind_dir', int),
+                   ('wind_speed', int), ('solar_rad', int), ('uv', int),
+                   ('evapotranspiration', float), ('rain_rate', float),
+                   ('heat_index', int), ('dew_point', float),
+                   ('wind_chill', float)]
+        for idx, (column, type) in enumerate(columns, 3):
+            rows[column] = lines[:, idx].astype(type)
 
-class _read_line_and_store_lightning_class(_read_line_and_store_event_class):
 
-    """Store lines of lightning data from the ESD"""
+class _read_line_and_store_singles_class(_read_line_and_store_event_class):
 
-    def store_line(self, line):
-        # ignore comment lines
-        if line[0][0] == '#':
-            return 0.
+    """Store lines of singles data from the ESD"""
 
-        # break up TSV line
-        (date, time_str, timestamp, nanoseconds, latitude, longitude,
-         current) = line[:7]
+    n_columns = 11
 
-        row = self.table.row
+    def convert_lines(self, lines, rows):
+        # columns: date, time, timestamp, followed by the singles columns
+        columns = ['mas_ch1_low', 'mas_ch1_high', 'mas_ch2_low',
+                   'mas_ch2_high', 'slv_ch1_low', 'slv_ch1_high',
+                   'slv_ch2_low', 'slv_ch2_high']
+        for idx, column in enumerate(columns, 3):
+            rows[column] = lines[:, idx].astype(int)
 
-        # convert string values to correct data types or calculate values
-        row['event_id'] = self.event_counter
-        row['timestamp'] = int(timestamp)
-        row['nanoseconds'] = int(nanoseconds)
-        row['ext_timestamp'] = int(timestamp) * int(1e9) + int(nanoseconds)
-        row['latitude'] = float(latitude)
-        row['longitude'] = float(longitude)
-        row['current'] = float(current)
 
-        # store event
-        row.append()
+class _read_line_and_store_lightning_class(_read_line_and_store_event_class):
 
-        self.event_counter += 1
-        # force flush every 1e6 rows to free buffers
-        if not self.event_counter % 1000000:
-            self.table.flush()
+    """Store lines of lightning data from the ESD"""
 
-        return int(timestamp)
+    n_columns = 7
+
+    def convert_lines(self, lines, rows):
+        # columns: date, time, timestamp, nanoseconds, latitude, longitude,
+        # current
+        nanoseconds = lines[:, 3].astype(int)
+        rows['nanoseconds'] = nanoseconds
+        rows['ext_timestamp'] = _ext_timestamps(rows['timestamp'], nanoseconds)
+        for idx, column in enumerate(['latitude', 'longitude', 'current'], 4):
+            rows[column] = lines[:, idx].astype(float)
+
+
+# URL, table getter and line writer for each data type
+_DATA_TYPES = {
+    'events': (EVENTS_URL, _get_or_create_events_table,
+               _read_line_and_store_event_class),
+    'weather': (WEATHER_URL, _get_or_create_weather_table,
+                _read_line_and_store_weather_class),
+    'singles': (SINGLES_URL, _get_or_create_singles_table,
+                _read_line_and_store_singles_class),
+    'lightning': (LIGHTNING_URL, _get_or_create_lightning_table,
+                  _read_line_and_store_lightning_class)}
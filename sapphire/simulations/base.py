@@ -26,8 +26,6 @@ import warnings
 import numpy as np
 import tables
 
-from six import iteritems
-
 from .. import storage
 from ..analysis.process_events import ProcessEvents
 from ..utils import pbar
@@ -47,6 +45,17 @@ class BaseSimulation(object):
 
     """
 
+    # Detector observables stored per detector as n1, n2, ..., t1, etc.
+    _numbered_observables = frozenset(['n', 'n_muons', 'n_electrons',
+                                       'n_gammas', 't'])
+    # Detector observables stored in one array for the station
+    _array_observables = frozenset(['pulseheights', 'integrals',
+                                    'integrals_muon', 'integrals_electron',
+                                    'integrals_gamma', 'pulseheights_muon',
+                                    'pulseheights_electron',
+                                    'pulseheights_gamma', 'traces',
+                                    'photontimes', 'coordinates'])
+
     def __init__(self, cluster, data, output_path='/', n=1, seed=None,
                  progress=True, save_detailed_traces=False, verbose=False):
         self.cluster = cluster
@@ -57,6 +66,9 @@ class BaseSimulation(object):
         self.verbose = verbose
         self.save_detailed_traces = save_detailed_traces
         self.use_preliminary = False
+        # Reused for the traces and coordinates of each station response
+        self._traces = np.zeros([4, 80])
+        self._coordinates = np.zeros([4, 2])
         self._prepare_output_tables()
 
         if seed is not None:
@@ -88,11 +100,6 @@ class BaseSimulation(object):
         """
         for (shower_id, shower_parameters) in enumerate(
                 self.generate_shower_parameters()):
-
-            chosen_energy = np.log10( shower_parameters['energy'] )
-            chosen_core_pos = shower_parameters['core_pos']
-            chosen_radius = np.sqrt( chosen_core_pos[0]**2. + chosen_core_pos[1]**2. )
-
             if self.use_preliminary:
                 station_events = self.pretrigger_simulate_events_for_shower(shower_parameters)
             else:
@@ -102,6 +109,11 @@ class BaseSimulation(object):
                 self.store_coincidence(shower_id, shower_parameters,
                                        station_events)
 
+        for station_group in self.station_groups:
+            station_group.events.flush()
+        self.coincidences.flush()
+        self.c_index.flush()
+
     def generate_shower_parameters(self, skip_large_distance=False):
         """Generate shower parameters like core position, energy, etc."""
         shower_parameters = {'core_pos': (None, None),
@@ -200,30 +212,30 @@ class BaseSimulation(object):
         :param detector_observables: list of observables of the detectors
                                      making up a station.
         :return: dictionary containing the familiar station observables
-                 like n1, n2, n3, etc.
+                 like n1, n2, n3, etc. The traces and coordinates arrays
+                 are reused for the next station, so store them first.
 
         """
-        station_observables = {'pulseheights': 4 * [-1.],
-                               'integrals': 4 * [-1.],
-                               'integrals_muon': 4 * [-1.],
-                               'integrals_electron': 4 * [-1.],
-                               'integrals_gamma': 4 * [-1.],
-                               'pulseheights_muon': 4 * [-1.],
-                               'pulseheights_electron': 4 * [-1.],
-                               'pulseheights_gamma': 4 * [-1.],
-                               'traces': np.empty([4,80]),
+        self._traces.fill(0)
+        self._coordinates.fill(0)
+        station_observables = {'pulseheights': np.full(4, -1, np.int16),
+                               'integrals': np.full(4, -1, np.int32),
+                               'integrals_muon': np.full(4, -1, np.int32),
+                               'integrals_electron': np.full(4, -1, np.int32),
+                               'integrals_gamma': np.full(4, -1, np.int32),
+                               'pulseheights_muon': np.full(4, -1, np.int32),
+                               'pulseheights_electron': np.full(4, -1, np.int32),
+                               'pulseheights_gamma': np.full(4, -1, np.int32),
+                               'traces': self._traces,
                                'photontimes': 4* [-1],
-                               'coordinates': np.zeros([4,2])}
+                               'coordinates': self._coordinates}
 
         for detector_id, observables in enumerate(detector_observables, 1):
-            for key, value in iteritems(observables):
-                if key in ['n', 'n_muons', 'n_electrons', 'n_gammas', 't']:
+            for key, value in observables.items():
+                if key in self._numbered_observables:
                     key = key + str(detector_id)
                     station_observables[key] = value
-                elif key in ['pulseheights', 'integrals', 'integrals_muon','integrals_electron',
-                             'integrals_gamma', 'pulseheights_muon', 'pulseheights_electron',
-                             'pulseheights_gamma','traces', 'photontimes',
-                             'coordinates' ]:
+                elif key in self._array_observables:
                     idx = detector_id - 1
                     station_observables[key][idx] = value
         return station_observables
@@ -238,17 +250,20 @@ class BaseSimulation(object):
 
         """
         events_table = self.station_groups[station_id].events
+        event_id = self._event_counts[station_id]
         row = events_table.row
-        row['event_id'] = events_table.nrows
-        for key, value in iteritems(station_observables):
-            if key in events_table.colnames:
+        row['event_id'] = event_id
+        for key, value in station_observables.items():
+            if key in self._events_colnames:
                 row[key] = value
             else:
                 warnings.warn('Unsupported variable')
+        self._last_event_timestamps[station_id] = (
+            row['ext_timestamp'], row['timestamp'], row['nanoseconds'])
         row.append()
-        events_table.flush()
-        
-        return events_table.nrows - 1
+        self._event_counts[station_id] += 1
+
+        return event_id
 
     def store_coincidence(self, shower_id, shower_parameters,
                           station_events):
@@ -277,25 +292,25 @@ class BaseSimulation(object):
 
         timestamps = []
         for station_id, event_index in station_events:
-            station = self.cluster.stations[station_id]
-            row['s%d' % station.number] = True
-            station_group = self.station_groups[station_id]
-            event = station_group.events[event_index]
+            row[self._station_columns[station_id]] = True
+            if event_index == self._event_counts[station_id] - 1:
+                # Latest event of the station, no need to read it back
+                timestamps.append(self._last_event_timestamps[station_id])
+                continue
+            events_table = self.station_groups[station_id].events
+            if event_index >= events_table.nrows:
+                # The event is still in the buffer of the table
+                events_table.flush()
+            event = events_table[event_index]
             timestamps.append((event['ext_timestamp'], event['timestamp'],
                                event['nanoseconds']))
 
-        try:
-            first_timestamp = sorted(timestamps)[0]
-        except IndexError:
-            first_timestamp = (0, 0, 0)
+        first_timestamp = min(timestamps) if timestamps else (0, 0, 0)
 
         row['ext_timestamp'], row['timestamp'], row['nanoseconds'] = \
             first_timestamp
         row.append()
-        self.coincidences.flush()
-
         self.c_index.append(station_events)
-        self.c_index.flush()
 
     def _prepare_coincidence_tables(self):
         """Create coincidence tables
@@ -314,8 +329,10 @@ class BaseSimulation(object):
             warnings.warn('Unable to store cluster object, to large for HDF.')
 
         description = storage.Coincidence
-        s_columns = {'s%d' % station.number: tables.BoolCol(pos=p)
-                     for p, station in enumerate(self.cluster.stations, 12)}
+        self._station_columns = ['s%d' % station.number
+                                 for station in self.cluster.stations]
+        s_columns = {column: tables.BoolCol(pos=p)
+                     for p, column in enumerate(self._station_columns, 12)}
         description.columns.update(s_columns)
 
         self.coincidences = self.data.create_table(
@@ -337,39 +354,46 @@ class BaseSimulation(object):
         self.cluster_group = self.data.create_group(self.output_path,
                                                     'cluster_simulations',
                                                     createparents=True)
+
+        description = dict(ProcessEvents.processed_events_description)
+        # Add to this description some simulation-only parameters
+        description["n_muons1"] = tables.Float32Col(shape=(), dflt=-1.0, pos=22)
+        description["n_muons2"] = tables.Float32Col(shape=(), dflt=-1.0, pos=23)
+        description["n_muons3"] = tables.Float32Col(shape=(), dflt=-1.0, pos=24)
+        description["n_muons4"] = tables.Float32Col(shape=(), dflt=-1.0, pos=25)
+        description["n_electrons1"] = tables.Float32Col(shape=(), dflt=-1.0, pos=26)
+        description["n_electrons2"] = tables.Float32Col(shape=(), dflt=-1.0, pos=27)
+        description["n_electrons3"] = tables.Float32Col(shape=(), dflt=-1.0, pos=28)
+        description["n_electrons4"] = tables.Float32Col(shape=(), dflt=-1.0, pos=29)
+        description["n_gammas1"] = tables.Float32Col(shape=(), dflt=-1.0, pos=30)
+        description["n_gammas2"] = tables.Float32Col(shape=(), dflt=-1.0, pos=31)
+        description["n_gammas3"] = tables.Float32Col(shape=(), dflt=-1.0, pos=32)
+        description["n_gammas4"] = tables.Float32Col(shape=(), dflt=-1.0, pos=33)
+        description["integrals_muon"] = tables.Int32Col(shape=4, dflt=-1.0, pos=34)
+        description["integrals_electron"] = tables.Int32Col(shape=4, dflt=-1.0, pos=35)
+        description["integrals_gamma"] = tables.Int32Col(shape=4, dflt=-1.0, pos=36)
+        description["shower_energy"] = tables.Float32Col(shape=(), dflt=-1.0, pos=37)
+        description["zenith"] = tables.Float32Col(shape=(), dflt=-1.0, pos=38)
+        description["azimuth"] = tables.Float32Col(shape=(), dflt=-1.0, pos=39)
+        description["core_distance"] = tables.Float32Col(shape=(), dflt=-1.0, pos=40)
+        description["cr_particle"] = tables.Float32Col(shape=(), dflt=-1.0, pos=41)
+        description["pulseheights_muon"] = tables.Int32Col(shape=4, dflt=-1.0, pos=42)
+        description["pulseheights_electron"] = tables.Int32Col(shape=4, dflt=-1.0, pos=43)
+        description["pulseheights_gamma"] = tables.Int32Col(shape=4, dflt=-1.0, pos=44)
+        description["coordinates"] = tables.Float32Col(shape=(4,2), dflt=-1, pos=45)
+        description["photontimes_idx"] = tables.Int32Col(shape=4, dflt=-1, pos=46)
+        description["seeds"] = tables.Int32Col(shape=2, dflt=-1, pos=47)
+        self._events_colnames = frozenset(description)
+
         self.station_groups = []
+        # Rows are buffered by PyTables, so count the events per station and
+        # keep the timestamps of the latest event for the coincidences
+        self._event_counts = []
+        self._last_event_timestamps = []
         for station in self.cluster.stations:
             station_group = self.data.create_group(self.cluster_group,
                                                    'station_%d' %
                                                    station.number)
-            description = ProcessEvents.processed_events_description
-            # Add to this description some simulation-only parameters
-            description["n_muons1"] = tables.Float32Col(shape=(), dflt=-1.0, pos=22)
-            description["n_muons2"] = tables.Float32Col(shape=(), dflt=-1.0, pos=23)
-            description["n_muons3"] = tables.Float32Col(shape=(), dflt=-1.0, pos=24)
-            description["n_muons4"] = tables.Float32Col(shape=(), dflt=-1.0, pos=25)
-            description["n_electrons1"] = tables.Float32Col(shape=(), dflt=-1.0, pos=26)
-            description["n_electrons2"] = tables.Float32Col(shape=(), dflt=-1.0, pos=27)
-            description["n_electrons3"] = tables.Float32Col(shape=(), dflt=-1.0, pos=28)
-            description["n_electrons4"] = tables.Float32Col(shape=(), dflt=-1.0, pos=29)
-            description["n_gammas1"] = tables.Float32Col(shape=(), dflt=-1.0, pos=30)         
-            description["n_gammas2"] = tables.Float32Col(shape=(), dflt=-1.0, pos=31)
-            description["n_gammas3"] = tables.Float32Col(shape=(), dflt=-1.0, pos=32)
-            description["n_gammas4"] = tables.Float32Col(shape=(), dflt=-1.0, pos=33)
-            description["integrals_muon"] = tables.Int32Col(shape=4, dflt=-1.0, pos=34)
-            description["integrals_electron"] = tables.Int32Col(shape=4, dflt=-1.0, pos=35)
-            description["integrals_gamma"] = tables.Int32Col(shape=4, dflt=-1.0, pos=36)
-            description["shower_energy"] = tables.Float32Col(shape=(), dflt=-1.0, pos=37)
-            description["zenith"] = tables.Float32Col(shape=(), dflt=-1.0, pos=38)
-            description["azimuth"] = tables.Float32Col(shape=(), dflt=-1.0, pos=39)
-            description["core_distance"] = tables.Float32Col(shape=(), dflt=-1.0, pos=40)
-            description["cr_particle"] = tables.Float32Col(shape=(), dflt=-1.0, pos=41)
-            description["pulseheights_muon"] = tables.Int32Col(shape=4, dflt=-1.0, pos=42)
-            description["pulseheights_electron"] = tables.Int32Col(shape=4, dflt=-1.0, pos=43)
-            description["pulseheights_gamma"] = tables.Int32Col(shape=4, dflt=-1.0, pos=44)
-            description["coordinates"] = tables.Float32Col(shape=(4,2), dflt=-1, pos=45)
-            description["photontimes_idx"] = tables.Int32Col(shape=4, dflt=-1, pos=46)
-            description["seeds"] = tables.Int32Col(shape=2, dflt=-1, pos=47)
             self.data.create_table(station_group, 'events', description,
                                    expectedrows=self.n)
             if self.save_detailed_traces:
@@ -378,6 +402,8 @@ class BaseSimulation(object):
                                          'Arrival times of photons')
 
             self.station_groups.append(station_group)
+            self._event_counts.append(0)
+            self._last_event_timestamps.append(None)
 
     def _store_station_index(self):
         """Stores the references to the station groups for coincidences"""
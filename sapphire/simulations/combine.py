@@ -3,6 +3,10 @@ from ..utils import pbar
 
 
 DEFAULT_TABLES = ['events']
+# Number of rows to read and append at once when copying a table
+COPY_CHUNK_SIZE = 65536
+
+
 def combine_simulations(simulations, station_path, output_file,
                         copy_tables=DEFAULT_TABLES, verbose=False, progress=False):
     """
@@ -34,13 +38,9 @@ def combine_simulations(simulations, station_path, output_file,
                     path = tables.path.join_path(station_path, to_copy)
                     copied_table = data.get_node(path)
                     to_table = output.get_node(path)
-                    row = to_table.row
                     length_table = len(to_table)
-                    for event in copied_table:
-                        for key in copied_table.colnames:
-                            if key=='event_id':
-                                row[key] = length_table+event['event_id']
-                            else:
-                                row[key] = event[key]
-                        row.append()
+                    for start in range(0, copied_table.nrows, COPY_CHUNK_SIZE):
+                        events = copied_table.read(start, start + COPY_CHUNK_SIZE)
+                        events['event_id'] += length_table
+                        to_table.append(events)
                     to_table.flush()
\ No newline at end of file
@@ -10,9 +10,12 @@ from math import acos, cos, pi, sin, sqrt
 import numpy as np
 import tables
 
-from ..utils import ceil_in_base
 from .base import BaseSimulation
 
+# Default maximum zenith for generated showers and its cosine
+_MAX_ZENITH = 63.75 * (pi / 180)
+_COS_MAX_ZENITH = cos(_MAX_ZENITH)
+
 
 class HiSPARCSimulation(BaseSimulation):
 
@@ -28,8 +31,9 @@ class HiSPARCSimulation(BaseSimulation):
 
         for station in self.cluster.stations:
             station.gps_offset = self.simulate_station_offset()
-            for detector in station.detectors:
-                detector.offset = self.simulate_detector_offset()
+            offsets = self.simulate_detector_offsets(len(station.detectors))
+            for detector, offset in zip(station.detectors, offsets):
+                detector.offset = offset
 
         # Store updated version of the cluster
         try:
@@ -45,7 +49,7 @@ class HiSPARCSimulation(BaseSimulation):
         :return: list of detector timing offsets in ns.
 
         """
-        return [cls.simulate_detector_offset() for _ in range(n_detectors)]
+        return np.random.normal(0, 2.77, n_detectors).tolist()
 
     @classmethod
     def simulate_detector_offset(cls):
@@ -81,11 +85,11 @@ class HiSPARCSimulation(BaseSimulation):
     def simulate_adc_sampling(cls, t):
         """Simulate ADC time binning due to the sampling frequency
 
-        :param t: time to be binned.
+        :param t: time to be binned, a single value or an array.
         :return: time ceiled in 2.5 ns base.
 
         """
-        return ceil_in_base(t, 2.5)
+        return 2.5 * np.ceil(t / 2.5)
 
     @classmethod
     def simulate_signal_transport_time(cls, n=1):
@@ -96,21 +100,16 @@ class HiSPARCSimulation(BaseSimulation):
 
         Distribution based on Fokkema2012 sec 4.2, figure 4.3
 
-        Be careful when editting this function, be sure to check both
-        the single and vectorized part.
-
         :param n: number of times to simulate
         :return: list of signal transport times
 
         """
         numbers = np.random.random(n)
-        if n < 20:
-            dt = np.array([2.5507 + 2.39885 * number if number < 0.39377 else
-                           1.56764 + 4.89536 * number for number in numbers])
-        else:
-            dt = np.where(numbers < 0.39377,
-                          2.5507 + 2.39885 * numbers,
-                          1.56764 + 4.89536 * numbers)
+        # Both parts are linear, select the coefficients instead
+        mask = numbers < 0.39377
+        base = np.where(mask, 2.5507, 1.56764)
+        slope = np.where(mask, 2.39885, 4.89536)
+        dt = base + slope * numbers
         return dt
 
     @classmethod
@@ -135,9 +134,6 @@ class HiSPARCSimulation(BaseSimulation):
         Montanus2014: J.C.M. Montanus, The Landau distribution,
                       Internal note (Nikhef), 22 may 2014
 
-        Be careful when editting this function, be sure to check both
-        the single and vectorized part.
-
         :param n: number of particles.
         :param theta: angle of incidence of the particles. Either a single
                       value valid for all particles, or an array with an angle
@@ -147,38 +143,23 @@ class HiSPARCSimulation(BaseSimulation):
         """
         # Limit cos theta to maximum length though the detector.
         min_costheta = 2. / 112.
-        costheta = np.cos(theta)
-        if isinstance(costheta, float):
-            costheta = max(costheta, min_costheta)
-        else:
-            costheta[costheta < min_costheta] = min_costheta
+        costheta = np.maximum(np.cos(theta), min_costheta)
 
         y = np.random.random(n)
 
-        # Prevent warning from the square root of negative values.
-        warnings.filterwarnings('ignore')
-        if n == 1:
-            if y < 0.3394:
-                mips = (0.48 + 0.8583 * sqrt(y)) / costheta
-            elif y < 0.4344:
-                mips = (0.73 + 0.7366 * y) / costheta
-            elif y < 0.9041:
-                mips = (1.7752 - 1.0336 * sqrt(0.9267 - y)) / costheta
-            else:
-                mips = (2.28 - 2.1316 * sqrt(1 - y)) / costheta
-            if not isinstance(costheta, float):
-                mips = sum(mips)
-        else:
-            mips = np.where(y < 0.3394,
-                            (0.48 + 0.8583 * np.sqrt(y)) / costheta,
-                            (0.73 + 0.7366 * y) / costheta)
-            mips = np.where(y < 0.4344, mips,
-                            (1.7752 - 1.0336 * np.sqrt(0.9267 - y)) / costheta)
-            mips = np.where(y < 0.9041, mips,
-                            (2.28 - 2.1316 * np.sqrt(1 - y)) / costheta)
-            mips = sum(mips)
-        warnings.resetwarnings()
-        return mips
+        # Only evaluate each part of the distribution where it applies
+        y, costheta = np.broadcast_arrays(y, costheta)
+        mips = np.empty(y.shape)
+        part = y < 0.3394
+        mips[part] = (0.48 + 0.8583 * np.sqrt(y[part])) / costheta[part]
+        part = (y >= 0.3394) & (y < 0.4344)
+        mips[part] = (0.73 + 0.7366 * y[part]) / costheta[part]
+        part = (y >= 0.4344) & (y < 0.9041)
+        mips[part] = ((1.7752 - 1.0336 * np.sqrt(0.9267 - y[part])) /
+                      costheta[part])
+        part = y >= 0.9041
+        mips[part] = (2.28 - 2.1316 * np.sqrt(1 - y[part])) / costheta[part]
+        return mips.sum()
 
     @classmethod
     def generate_core_position(cls, r_max):
@@ -202,7 +183,26 @@ class HiSPARCSimulation(BaseSimulation):
         return x, y
 
     @classmethod
-    def generate_zenith(cls, min=0, max=63.75 * (pi / 180)):
+    def generate_core_positions(cls, r_max, n):
+        """Generate multiple random core positions within a circle
+
+        Batched version of :meth:`generate_core_position`. All radii are
+        drawn before the angles, so the result differs from n separate
+        calls with the same seed.
+
+        :param r_max: Maximum core distance, in meters.
+        :param n: number of core positions to generate.
+        :return: arrays of x and y positions in the disc with radius r_max.
+
+        """
+        r = np.sqrt(np.random.uniform(0, r_max ** 2, n))
+        phi = np.random.uniform(-pi, pi, n)
+        x = r * np.cos(phi)
+        y = r * np.sin(phi)
+        return x, y
+
+    @classmethod
+    def generate_zenith(cls, min=0, max=_MAX_ZENITH):
         """Generate a random zenith
 
         Generate a random zenith for a uniform distribution on a sphere.
@@ -220,9 +220,27 @@ class HiSPARCSimulation(BaseSimulation):
         :return: random zenith position on a sphere, in radians.
 
         """
-        p = np.random.uniform(cos(max), cos(min))
+        cos_max = _COS_MAX_ZENITH if max == _MAX_ZENITH else cos(max)
+        cos_min = 1. if min == 0 else cos(min)
+        p = np.random.uniform(cos_max, cos_min)
         return acos(p)
 
+    @classmethod
+    def generate_zeniths(cls, n, min=0, max=_MAX_ZENITH):
+        """Generate multiple random zeniths
+
+        Batched version of :meth:`generate_zenith`.
+
+        :param n: number of zeniths to generate.
+        :param min,max: minimum and maximum zenith angles, in radians.
+        :return: array of random zenith positions on a sphere, in radians.
+
+        """
+        cos_max = _COS_MAX_ZENITH if max == _MAX_ZENITH else cos(max)
+        cos_min = 1. if min == 0 else cos(min)
+        p = np.random.uniform(cos_max, cos_min, n)
+        return np.arccos(p)
+
     @classmethod
     def generate_attenuated_zenith(cls):
         """Generate a random zenith
@@ -240,6 +258,19 @@ class HiSPARCSimulation(BaseSimulation):
         p = np.random.random()
         return cls.inverse_zenith_probability(p)
 
+    @classmethod
+    def generate_attenuated_zeniths(cls, n):
+        """Generate multiple random zeniths
+
+        Batched version of :meth:`generate_attenuated_zenith`.
+
+        :param n: number of zeniths to generate.
+        :return: array of random zenith angles, in radians.
+
+        """
+        p = np.random.random(n)
+        return cls.inverse_zenith_probabilities(p)
+
     @classmethod
     def inverse_zenith_probability(cls, p):
         """Inverse cumulative probability distribution for zenith
@@ -253,6 +284,19 @@ class HiSPARCSimulation(BaseSimulation):
         """
         return acos((1 - p) ** (1 / 8.))
 
+    @classmethod
+    def inverse_zenith_probabilities(cls, p):
+        """Inverse cumulative probability distribution for zenith
+
+        Array version of :meth:`inverse_zenith_probability`.
+
+        :param p: array of probability values between 0 and 1.
+        :return: zeniths with corresponding cumulative probabilities, in
+                 radians.
+
+        """
+        return np.arccos((1 - p) ** (1 / 8.))
+
     @classmethod
     def generate_azimuth(cls):
         """Generate a random azimuth
@@ -264,6 +308,16 @@ class HiSPARCSimulation(BaseSimulation):
         """
         return np.random.uniform(-pi, pi)
 
+    @classmethod
+    def generate_azimuths(cls, n):
+        """Generate multiple random azimuths
+
+        :param n: number of azimuths to generate.
+        :return: array of shower azimuth angles, in radians.
+
+        """
+        return np.random.uniform(-pi, pi, n)
+
     @classmethod
     def generate_energy(cls, e_min=1e13, e_max=1e18, e_knee=3e15, alpha=-2.75, beta=-3.1):
         """Generate a random shower energy
@@ -292,6 +346,34 @@ class HiSPARCSimulation(BaseSimulation):
         
         return energy
 
+    @classmethod
+    def generate_energies(cls, n, e_min=1e13, e_max=1e18, e_knee=3e15, alpha=-2.75, beta=-3.1):
+        """Generate multiple random shower energies
+
+        Batched version of :meth:`generate_energy`. The energies above the
+        knee are redrawn together after the first draw, so the result
+        differs from n separate calls with the same seed.
+
+        :param n: number of energies to generate.
+        :param e_min,e_max: Energy bounds for the distribution (in eV).
+        :param alpha: Steepness of the power law distribution.
+        :return: array of primary particle energies, in eV.
+
+        """
+        x = np.random.random(n)
+
+        a1 = alpha + 1.
+        energies = (e_min ** a1 + x * (e_max ** a1 - e_min ** a1)) ** (1 / a1)
+
+        above = energies > e_knee
+        if above.any():
+            e_min = max(e_knee, e_min)
+            x = np.random.random(above.sum())
+            a2 = beta + 1.
+            energies[above] = (e_min ** a2 + x * (e_max ** a2 - e_min ** a2)) ** (1 / a2)
+
+        return energies
+
 
 class ErrorlessSimulation(HiSPARCSimulation):
 
@@ -319,7 +401,7 @@ class ErrorlessSimulation(HiSPARCSimulation):
     @classmethod
     def simulate_signal_transport_time(cls, n=1):
 
-        return np.array([0.] * n)
+        return np.zeros(n)
 
     @classmethod
     def simulate_detector_mips(cls, n, theta):
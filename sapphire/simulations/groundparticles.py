@@ -22,7 +22,6 @@ from time import time
 import subprocess
 import shutil
 import os
-from six import iteritems
 
 import warnings
 import numpy as np
@@ -57,6 +56,7 @@ class GroundParticlesGEANT4Simulation(ErrorlessSimulation):
         """
         super(GroundParticlesGEANT4Simulation, self).__init__(*args, **kwargs)
         self.cutoff_number_of_particles = cutoff_number_of_particles
+        self._detector_corners = {}
         self.corsikafile = tables.open_file(corsikafile_path, 'r')
         self.groundparticles = self.corsikafile.get_node('/groundparticles')
         self.max_core_distance = max_core_distance
@@ -136,50 +136,111 @@ class GroundParticlesGEANT4Simulation(ErrorlessSimulation):
 
         self.cluster.set_coordinates(-xp, -yp, 0, -alpha)
 
+        # The detector corners change with the cluster
+        self._detector_corners = {}
+
+    def _get_projected_detector_corners(self, detector, zenith):
+        """Get the enlarged detector corners projected along the shower axis
+
+        The corners are cached until the cluster is prepared for the next
+        shower, because they are needed both to select the particles and
+        to determine where they hit the detector.
+
+        :param detector: :class:`~sapphire.clusters.Detector` for which
+                         to get the corners.
+        :param zenith: zenith of the shower, in radians.
+        :return: list of the four projected corners.
+
+        """
+        try:
+            return self._detector_corners[detector]
+        except KeyError:
+            pass
+
+        z = detector.get_coordinates()[-1]
+        detcorners = detector.get_corners()
+
+        # Obtain corners
+        c1 = np.array(detcorners[0])
+        c2 = np.array(detcorners[1])
+        c3 = np.array(detcorners[2])
+        c4 = np.array(detcorners[3])
+
+        # Rotate corners to convenient system where the axes of the detector align with x and y
+        # I don't know what all the entries in the orientation list are but the last one works.
+        theta = detector.orientation[-1] + (self.shower_azimuth - self.corsika_azimuth)
+        THETA = np.array([[np.cos(theta),-1*np.sin(theta)], [np.sin(theta),np.cos(theta)]])
+
+        c2_new = np.inner(THETA, (c2 - c1)) + c1
+        c3_new = np.inner(THETA, (c3 - c1)) + c1
+        c4_new = np.inner(THETA, (c4 - c1)) + c1
+
+        # Increase the size of the detector to also include perspex hits and near misses
+        # (which could still be a hit because the skibox lid is a bit higher than the scintillator)
+        c1_new = np.array([c1[0] - 0.1, c1[1] - 0.1])
+        c2_new = np.array([c2_new[0] + 0.1, c2_new[1] - 0.1])
+        c3_new = np.array([c3_new[0] + 0.1, c3_new[1] + 0.675 + 0.1])
+        c4_new = np.array([c4_new[0] - 0.1, c4_new[1] + 0.675 + 0.1])
+
+        # Rotate the system back
+        theta = -1.0 * theta
+        THETA_BACK = np.array([[np.cos(theta),-1*np.sin(theta)], [np.sin(theta),np.cos(theta)]])
+
+        # Slightly bigger corners now
+        corners = [np.inner(THETA_BACK, (corner - c1)) + c1
+                   for corner in (c1_new, c2_new, c3_new, c4_new)]
+
+        azimuth = self.corsika_azimuth
+
+        znxnz = z * tan(zenith) * cos(azimuth)
+        znynz = z * tan(zenith) * sin(azimuth)
+
+        cproj = [corner - (znxnz, znynz) for corner in corners]
+        self._detector_corners[detector] = cproj
+
+        return cproj
+
     def _simulateCathode(self, N_photon):
         """Simulate Cathode
-        
-        :param N_photon: number photons
+
+        Each photon has a 25% chance to emit an electron.
+
+        :param N_photon: number photons, or an array with the number of
+                         photons per time bin.
         :return: number of emitted cathode electrons
         
         """
-        N_electron = 0
-        for i in range(0,int(N_photon)):
-            if np.random.random() < .25:
-                N_electron += 1
-        return N_electron
+        return np.random.binomial(np.asarray(N_photon, dtype=int), .25)
 
-    def _simulateTrace(self, N, start, t_rise=7.0, t_fall=25.0, stop=300.0, Gmean=17.0e6, R = 50.0):
+    def _simulateTrace(self, N, t_rise=7.0, t_fall=25.0, Gmean=17.0e6, R = 50.0):
         """Simulate event trace
-        
-        :param N: Number of emitted cathode electrons
-        :param start: Photon arrivel time in ns
+
+        The pulses of the electrons emitted in each 2.5 ns bin are added by
+        convolving the number of electrons (times the gain) with the pulse
+        shape.
+
+        :param N: array with the number of emitted cathode electrons per
+                  2.5 ns bin.
         :param t_rise: Risetime of the pulse
         :param t_fall: Falltime of the pulse
-        :param stop: End of trace
         :param GR: Gain times resistance of the PMT
-        
+
         :return: trace with binned simulated data according to Leo ISBN 978-3-642-57920-2 page 190
-            
+
         """
-        if N == 0:
-            trace = np.zeros(80)
-            return trace
-        trace = []
+        N = np.asarray(N)
         e = 1.6e-19 # charge electron
-        sigma = Gmean / 10
-        sigma = sigma / np.sqrt(N)
-        G = np.random.normal(Gmean, sigma) # Gains are normally distributed with sigma 10%
-        for i in np.arange(0,start,2.5):
-            trace.append(0)
-        for i in np.arange(start,stop,2.5):
-            t = np.float(i - start)
-            constant = (G * R * N * e)/((t_fall - t_rise)*1e-9) # time in s instead of ns
-            trace.append( constant * ( np.exp(-t/t_rise) - np.exp(-t/t_fall) ) )
+        has_electrons = N > 0
+        G = np.zeros(len(N))
+        # Gains are normally distributed with sigma 10%
+        G[has_electrons] = np.random.normal(Gmean, Gmean / 10 / np.sqrt(N[has_electrons]))
+        constant = (G * R * N * e)/((t_fall - t_rise)*1e-9) # time in s instead of ns
 
-        trace = np.array(trace)
+        t = 2.5 * np.arange(len(N))
+        pulse = np.exp(-t/t_rise) - np.exp(-t/t_fall)
+        trace = np.convolve(constant, pulse)[:len(N)]
 
-        return np.array(trace)
+        return trace
 
     def _simulate_PMT(self, photontimes):
         """Simulate an entire PMT from cathode to response of PMT type
@@ -194,19 +255,16 @@ class GroundParticlesGEANT4Simulation(ErrorlessSimulation):
         if len(photontimes) == 0:
             return np.array([0])
         
-        # Determine how many particles arrived per 2.5 nanosecond
+        # Determine how many particles arrived per 2.5 nanosecond, between
+        # 0 and 200 ns. Like np.histogram, the last bin includes 200 ns.
+        photontimes = np.asarray(photontimes)
+        photontimes = photontimes[(photontimes >= 0) & (photontimes <= 200)]
+        bins = np.minimum((photontimes / 2.5).astype(int), TRACE_LENGTH - 1)
+        n_phot = np.bincount(bins, minlength=TRACE_LENGTH)
 
-        n_phot, bin_edges = np.histogram(photontimes,bins=np.linspace(0,200,81))
-        t_arr = (0.5*(bin_edges[1:] + bin_edges[:-1]))-1.25
-        
-        # Simulate the ideal response per nanosecond and combine all single ns responses
-        n_elec0 = self._simulateCathode(n_phot[0])
-        trace = self._simulateTrace(n_elec0, t_arr[0], stop=t_arr[-1]+2.5)
-        for nphot, tarr in zip(n_phot[1:],t_arr[1:]):
-            n_elec = self._simulateCathode(nphot)
-            trace += self._simulateTrace(n_elec, tarr, stop=t_arr[-1]+2.5)
-
-        trace = np.array(trace)
+        # Simulate the ideal response per 2.5 ns bin and combine all responses
+        n_elec = self._simulateCathode(n_phot)
+        trace = self._simulateTrace(n_elec)
 
         return trace
 
@@ -338,18 +396,13 @@ class GroundParticlesGEANT4Simulation(ErrorlessSimulation):
 
         # if cutoff is defined, not all particles are calculated
         if self.cutoff_number_of_particles is not None:
-            idx = []
-            idx_rest = []
-            i = 0
-            for particle in particles:
-                if particle['particle_id'] in [2,3,5,6]:
-                    idx.append(i)
-                else:
-                    idx_rest.append(i)
-                i += 1
+            is_lepton = np.isin(particles['particle_id'], [2, 3, 5, 6])
+            idx = np.flatnonzero(is_lepton)
             number_of_electrons = len(idx)
             if number_of_electrons<self.cutoff_number_of_particles:
-                idx.extend(idx_rest[:self.cutoff_number_of_particles-number_of_electrons])
+                idx_rest = np.flatnonzero(~is_lepton)
+                idx = np.concatenate(
+                    [idx, idx_rest[:self.cutoff_number_of_particles-number_of_electrons]])
 
             idx = np.random.permutation(idx) # shuffle the electrons
             idx = idx[:self.cutoff_number_of_particles]
@@ -360,78 +413,34 @@ class GroundParticlesGEANT4Simulation(ErrorlessSimulation):
         earliest_particle = np.inf
         #plt.figure()
 
-        for i, particle in enumerate(particles):
+        # The detector geometry is the same for all particles
+        cproj1, cproj2, _, cproj4 = self._get_projected_detector_corners(
+            detector, shower_parameters['zenith'])
+
+        # Determine the position the particles hit the detector in the
+        # corsika detector reference system (-25 < x < 25 and -50 < y < 50)
+        # taking projection due to detector-height differences into
+        # account.
+        x = particles['x'].astype(float)
+        y = particles['y'].astype(float)
+
+        # Here I determine the distance from a point to a line
+        edge = cproj2 - cproj1
+        xdistance = (np.abs(edge[0] * (cproj1[1] - y) - edge[1] * (cproj1[0] - x)) /
+                     np.linalg.norm(edge))
+        edge = cproj4 - cproj1
+        ydistance = (np.abs(edge[0] * (cproj1[1] - y) - edge[1] * (cproj1[0] - x)) /
+                     np.linalg.norm(edge))
+
+        # Convert to cm
+        xdetcoords = 100 * xdistance - 50 - 10
+        ydetcoords = 100 * ydistance - 25 - 10
+
+        for particle, xdetcoord, ydetcoord in zip(particles, xdetcoords, ydetcoords):
             # Determine which particle hit the detector
             particle_id = particle["particle_id"]
             particletype = particle_types[particle_id]
 
-            # Determine the position the particle hit the detector in the
-            # corsika detector reference system (-25 < x < 25 and -50 < y < 50)
-            # taking projection due to detector-height differences into
-            # account.
-            x = particle["x"]
-            y = particle["y"]
-            p = np.array([x, y])
-            
-            detx, dety, detz = detector.get_coordinates()
-            detcorners = detector.get_corners()
-            
-            # Obtain corners
-            c1 = np.array(detcorners[0])
-            c2 = np.array(detcorners[1])
-            c3 = np.array(detcorners[2])
-            c4 = np.array(detcorners[3])
-            
-            # Rotate corners to convenient system where the axes of the detector align with x and y
-            # I don't know what all the entries in the orientation list are but the last one works.
-            theta = detector.orientation[-1] + (self.shower_azimuth - self.corsika_azimuth)
-            THETA = np.array([[np.cos(theta),-1*np.sin(theta)], [np.sin(theta),np.cos(theta)]])
-            
-            c1_new = np.inner(THETA, (c1 - c1)) + c1
-            c2_new = np.inner(THETA, (c2 - c1)) + c1
-            c3_new = np.inner(THETA, (c3 - c1)) + c1
-            c4_new = np.inner(THETA, (c4 - c1)) + c1
-            
-            # Increase the size of the detector to also include perspex hits and near misses 
-            # (which could still be a hit because the skibox lid is a bit higher than the scintillator)
-            c1_new = np.array([c1_new[0] - 0.1, c1_new[1] - 0.1])
-            c2_new = np.array([c2_new[0] + 0.1, c2_new[1] - 0.1])
-            c3_new = np.array([c3_new[0] + 0.1, c3_new[1] + 0.675 + 0.1])
-            c4_new = np.array([c4_new[0] - 0.1, c4_new[1] + 0.675 + 0.1])
-            
-            # Rotate the system back
-            theta = -1.0 * theta
-            THETA_BACK = np.array([[np.cos(theta),-1*np.sin(theta)], [np.sin(theta),np.cos(theta)]])
-            
-            c1_new = np.inner(THETA_BACK, (c1_new - c1)) + c1
-            c2_new = np.inner(THETA_BACK, (c2_new - c1)) + c1
-            c3_new = np.inner(THETA_BACK, (c3_new - c1)) + c1
-            c4_new = np.inner(THETA_BACK, (c4_new - c1)) + c1
-            
-            # Slightly bigger detcorners now
-            detcorners = [c1_new, c2_new, c3_new, c4_new]
-
-            zenith = shower_parameters['zenith']
-            azimuth = self.corsika_azimuth
-
-            znxnz = detz * tan(zenith) * cos(azimuth)
-            znynz = detz * tan(zenith) * sin(azimuth)
-            
-            detcproj = [(cx - znxnz, cy - znynz) for cx, cy in detcorners]
-            cproj1 = np.array([detcproj[0][0],detcproj[0][1]])
-            cproj2 = np.array([detcproj[1][0],detcproj[1][1]])
-            cproj3 = np.array([detcproj[2][0],detcproj[2][1]])
-            cproj4 = np.array([detcproj[3][0],detcproj[3][1]])
-            
-            # Here I determine the distance from a point to a line
-            xdistance = (np.linalg.norm(np.cross(cproj2 - cproj1, cproj1 - p)) /
-                         np.linalg.norm(cproj2 - cproj1))
-            ydistance = (np.linalg.norm(np.cross(cproj4 - cproj1, cproj1 - p)) /
-                         np.linalg.norm(cproj4 - cproj1))
-           
-            # Convert to cm 
-            xdetcoord = 100 * xdistance - 50 - 10
-            ydetcoord = 100 * ydistance - 25 - 10
             # Determine at which angle the particle hit the detector
             px = particle["p_x"]
             py = particle["p_y"]
@@ -483,19 +492,19 @@ class GroundParticlesGEANT4Simulation(ErrorlessSimulation):
                     # Succesful interaction, keep statistics
                     if particle_id == 1:
                         n_gammas += 1
-                        arrived_photons_per_particle_gamma = np.append(arrived_photons_per_particle_gamma,photontimes)
+                        arrived_photons_per_particle_gamma.append(photontimes)
                     elif particle_id in [2, 3]:
                         n_electrons += 1
                         if t_later_than_first<earliest_particle:
                             local_cor = [xdetcoord, ydetcoord]
                             earliest_particle = t_later_than_first
-                        arrived_photons_per_particle_electron = np.append(arrived_photons_per_particle_electron,photontimes)
+                        arrived_photons_per_particle_electron.append(photontimes)
                     elif particle_id in [5, 6]:
                         n_muons += 1
                         if t_later_than_first<earliest_particle:
                             local_cor = [xdetcoord, ydetcoord]
                             earliest_particle = t_later_than_first
-                        arrived_photons_per_particle_muon = np.append(arrived_photons_per_particle_muon,photontimes)
+                        arrived_photons_per_particle_muon.append(photontimes)
 
 
 
@@ -522,9 +531,19 @@ class GroundParticlesGEANT4Simulation(ErrorlessSimulation):
             #    t_later_than_first)
             #plt.plot(self._simulate_PMT(photontimes), label=label_particle)
 
-            arrived_photons_per_particle = np.append(arrived_photons_per_particle,
-                                                     photontimes)
+            arrived_photons_per_particle.append(photontimes)
             arrivaltimes.append(arrivaltime)
+
+        # Join the photons of all particles, the empty list makes sure
+        # there is something to join if no particle of a type interacted.
+        arrived_photons_per_particle = np.concatenate(
+            [[]] + arrived_photons_per_particle)
+        arrived_photons_per_particle_muon = np.concatenate(
+            [[]] + arrived_photons_per_particle_muon)
+        arrived_photons_per_particle_electron = np.concatenate(
+            [[]] + arrived_photons_per_particle_electron)
+        arrived_photons_per_particle_gamma = np.concatenate(
+            [[]] + arrived_photons_per_particle_gamma)
         #plt.legend()
         #plt.savefig('all_particles.png')
         #plt.close()
@@ -586,10 +605,15 @@ class GroundParticlesGEANT4Simulation(ErrorlessSimulation):
 
         """
         n_detectors = len(detector_observables)
-        detectors_low = sum([True for observables in detector_observables
-                             if observables['pulseheights'] > 30])
-        detectors_high = sum([True for observables in detector_observables
-                              if observables['pulseheights'] > 70])
+        # Count both thresholds in one pass, a high signal is also low
+        detectors_low = 0
+        detectors_high = 0
+        for observables in detector_observables:
+            pulseheight = observables['pulseheights']
+            if pulseheight > 30:
+                detectors_low += 1
+                if pulseheight > 70:
+                    detectors_high += 1
         treshold_low = 3
         if n_detectors == 4 and (detectors_high >= 2 or detectors_low >= treshold_low):
             return True
@@ -664,42 +688,6 @@ class GroundParticlesGEANT4Simulation(ErrorlessSimulation):
         detector_boundary = 3.0
 
         x, y, z = detector.get_coordinates()
-        detcorners = detector.get_corners()
-
-        # Obtain corners
-        c1 = np.array(detcorners[0])
-        c2 = np.array(detcorners[1])
-        c3 = np.array(detcorners[2])
-        c4 = np.array(detcorners[3])
-        
-        # Rotate corners to convenient system where the axes of the detector align with x and y
-        # I don't know what all the entries in the orientation list are but the last one works.
-        theta = detector.orientation[-1] + (self.shower_azimuth - self.corsika_azimuth)
-        THETA = np.array([[np.cos(theta),-1*np.sin(theta)], [np.sin(theta),np.cos(theta)]])
-        
-        c1_new = np.inner(THETA, (c1 - c1)) + c1
-        c2_new = np.inner(THETA, (c2 - c1)) + c1
-        c3_new = np.inner(THETA, (c3 - c1)) + c1
-        c4_new = np.inner(THETA, (c4 - c1)) + c1
-        
-        # Increase the size of the detector to also include perspex hits and near misses 
-        # (which could still be a hit because the skibox lid is a bit higher than the scintillator)
-        c1_new = np.array([c1_new[0] - 0.1, c1_new[1] - 0.1])
-        c2_new = np.array([c2_new[0] + 0.1, c2_new[1] - 0.1])
-        c3_new = np.array([c3_new[0] + 0.1, c3_new[1] + 0.675 + 0.1])
-        c4_new = np.array([c4_new[0] - 0.1, c4_new[1] + 0.675 + 0.1])
-        
-        # Rotate the system back
-        theta = -1.0 * theta
-        THETA_BACK = np.array([[np.cos(theta),-1*np.sin(theta)], [np.sin(theta),np.cos(theta)]])
-        
-        c1_new = np.inner(THETA_BACK, (c1_new - c1)) + c1
-        c2_new = np.inner(THETA_BACK, (c2_new - c1)) + c1
-        c3_new = np.inner(THETA_BACK, (c3_new - c1)) + c1
-        c4_new = np.inner(THETA_BACK, (c4_new - c1)) + c1
-        
-        # Slightly bigger corners now
-        corners = [c1_new, c2_new, c3_new, c4_new]
 
         zenith = shower_parameters['zenith']
         azimuth = self.corsika_azimuth
@@ -709,7 +697,7 @@ class GroundParticlesGEANT4Simulation(ErrorlessSimulation):
         xproj = x - znxnz
         yproj = y - znynz
 
-        cproj = [(cx - znxnz, cy - znynz) for cx, cy in corners]
+        cproj = self._get_projected_detector_corners(detector, zenith)
 
         b11, line1, b12 = self.get_line_boundary_eqs(*cproj[0:3])
         b21, line2, b22 = self.get_line_boundary_eqs(*cproj[1:4])
@@ -775,16 +763,17 @@ class GroundParticlesGEANT4Simulation(ErrorlessSimulation):
 
         """
         events_table = self.station_groups[station_id].events
+        event_id = self._event_counts[station_id]
         row = events_table.row
-        row['event_id'] = events_table.nrows
+        row['event_id'] = event_id
         row['shower_energy'] = self.corsika_energy
         row['zenith'] = self.corsika_zenith
         row['azimuth'] = self.shower_azimuth
         row['cr_particle'] = self.cr_particle
         row['core_distance'] = self.core_distance
         row['seeds'] = self.seeds
-        for key, value in iteritems(station_observables):
-            if key in events_table.colnames:
+        for key, value in station_observables.items():
+            if key in self._events_colnames:
                 row[key] = value
             elif key == 'photontimes' and self.save_detailed_traces:
                 reference_idx = []
@@ -797,10 +786,12 @@ class GroundParticlesGEANT4Simulation(ErrorlessSimulation):
                 row['photontimes_idx'] = reference_idx
             else:
                 warnings.warn('Unsupported variable: %s' % key)
+        self._last_event_timestamps[station_id] = (
+            row['ext_timestamp'], row['timestamp'], row['nanoseconds'])
         row.append()
-        events_table.flush()
+        self._event_counts[station_id] += 1
 
-        return events_table.nrows - 1
+        return event_id
 
 
 class GroundParticlesSimulation(HiSPARCSimulation):
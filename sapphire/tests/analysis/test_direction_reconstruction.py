@@ -2,10 +2,12 @@ import unittest
 import warnings
 
 from mock import MagicMock, Mock, patch, sentinel
-from numpy import arcsin, arctan, array, isnan, nan, pi, sqrt
+from numpy import arcsin, arctan, array, cos, inf, isnan, linspace, nan, pi, sin, sqrt
+from numpy.testing import assert_allclose
 
 from sapphire.analysis import direction_reconstruction
 from sapphire.simulations.showerfront import ConeFront
+from sapphire.utils import c
 
 
 class EventDirectionReconstructionTest(unittest.TestCase):
@@ -740,6 +742,40 @@ class DirectAlgorithmTest(unittest.TestCase, DirectAlgorithm):
     def setUp(self):
         self.algorithm = direction_reconstruction.DirectAlgorithm()
 
+    def test_rel_theta_errorsq(self):
+        """Check eq 4.23 against its separately computed terms"""
+
+        theta = pi / 8
+        phis = linspace(-pi + .1, pi - .1, 9)
+        phi1, phi2, r1, r2 = (.3, 1.4, 10, 12)
+        alg = self.algorithm
+
+        sintheta = sin(theta)
+        sinphiphi1 = sin(phis - phi1)
+        aa = (r1 ** 2 * sinphiphi1 ** 2 *
+              alg.rel_phi_errorsq(theta, phis, phi1, phi2, r1, r2))
+        bb = -(2 * r1 * c * sinphiphi1 *
+               (alg.dphi_dt0(theta, phis, phi1, phi2, r1, r2) -
+                alg.dphi_dt1(theta, phis, phi1, phi2, r1, r2)))
+        den = r1 ** 2 * (1 - sintheta ** 2) * cos(phis - phi1) ** 2
+        errsq = (aa * sintheta ** 2 + bb * sintheta + 2 * c ** 2) / den
+
+        assert_allclose(alg.rel_theta1_errorsq(theta, phis, phi1, phi2, r1, r2), errsq)
+        assert_allclose(alg.rel_theta2_errorsq(theta, phis, phi2, phi1, r2, r1), errsq)
+
+    def test_degenerate_errorsq(self):
+        """Vertical showers and collinear detectors give infinite errors"""
+
+        alg = self.algorithm
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            # theta = 0
+            self.assertEqual(alg.rel_theta1_errorsq(0., .5, .3, 1.4), inf)
+            self.assertEqual(alg.rel_theta2_errorsq(0., .5, .3, 1.4), inf)
+            self.assertEqual(alg.rel_phi_errorsq(0., .5, .3, 1.4), inf)
+            # phi1 == phi2
+            self.assertEqual(alg.rel_phi_errorsq(.4, .3, .3, .3), inf)
+
 
 class DirectAlgorithmCartesianTest(unittest.TestCase, DirectAlgorithm):
 
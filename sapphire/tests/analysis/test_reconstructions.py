@@ -4,6 +4,7 @@ import unittest
 import tables
 
 from mock import MagicMock, patch, sentinel
+from numpy import array, dtype, isnan
 
 from sapphire.analysis import reconstructions
 
@@ -78,7 +79,8 @@ class ReconstructESDEventsTest(unittest.TestCase):
         self.rec.prepare_output()
         self.data.create_table.assert_called_once_with(
             self.rec.station_group, sentinel.destination,
-            reconstructions.ReconstructedEvent, expectedrows=sentinel.nrows)
+            reconstructions.ReconstructedEvent, expectedrows=sentinel.nrows,
+            filters=reconstructions.FILTERS)
         self.assertEqual(self.rec.reconstructions, self.data.create_table.return_value)
         self.assertEqual(self.rec.reconstructions._v_attrs.station, self.station)
 
@@ -94,7 +96,8 @@ class ReconstructESDEventsTest(unittest.TestCase):
             self.rec.station_group, sentinel.destination, recursive=True)
         self.data.create_table.assert_called_with(
             self.rec.station_group, sentinel.destination,
-            reconstructions.ReconstructedEvent, expectedrows=sentinel.nrows)
+            reconstructions.ReconstructedEvent, expectedrows=sentinel.nrows,
+            filters=reconstructions.FILTERS)
         self.assertEqual(self.rec.reconstructions, self.data.create_table.return_value)
         self.assertEqual(self.rec.reconstructions._v_attrs.station, self.station)
 
@@ -128,16 +131,31 @@ class ReconstructESDEventsTest(unittest.TestCase):
         self.rec.get_detector_offsets()
         self.assertEqual(self.rec.offsets, [sentinel.offset, sentinel.offset])
 
-    def test__store_reconstruction(self):
-        event = MagicMock()
-        # _store_reconstruction calls  min(event['n1'], ...).
-        # but MagicMock is unordered in python 3!
-        # Mock a dict that always returns 42.
-        event.__getitem__.side_effect = lambda x: 42.
-        self.rec.reconstructions = MagicMock()
-        self.rec._store_reconstruction(event, sentinel.core_x, sentinel.core_y,
-                                       sentinel.theta, sentinel.phi, [1, 3, 4])
-        self.rec.reconstructions.row.append.assert_called_once_with()
+    def test_store_reconstructions(self):
+        columns = {'event_id': [1, 2], 'ext_timestamp': [10, 20],
+                   'n1': [1., 2.], 'n2': [3., 4.], 'n3': [5., 6.],
+                   'n4': [.5, 7.]}
+        self.rec.events = MagicMock(nrows=2)
+        self.rec.events.col.side_effect = lambda key: array(columns[key])
+        self.rec.reconstructions = MagicMock(dtype=dtype(
+            [('id', 'u4'), ('ext_timestamp', 'u8'), ('min_n', 'f4'),
+             ('x', 'f4'), ('y', 'f4'), ('zenith', 'f4'), ('azimuth', 'f4'),
+             ('d1', '?'), ('d2', '?'), ('d3', '?'), ('d4', '?')]))
+        self.rec.core_x = [1., 2.]
+        self.rec.core_y = [3., 4.]
+        self.rec.theta = [.1, .2]
+        self.rec.phi = [.3, .4]
+        self.rec.detector_ids = [[1, 2, 3], []]
+        self.rec.store_reconstructions()
+        rows = self.rec.reconstructions.append.call_args[0][0]
+        self.assertEqual(list(rows['id']), [1, 2])
+        self.assertEqual(list(rows['ext_timestamp']), [10, 20])
+        self.assertEqual(list(rows['min_n']), [.5, -999.])
+        self.assertEqual(list(rows['x']), [1., 2.])
+        self.assertEqual(list(rows['d1']), [False, False])
+        self.assertEqual(list(rows['d2']), [True, False])
+        self.assertEqual(list(rows['d4']), [True, False])
+        self.rec.reconstructions.flush.assert_called_once_with()
 
 
 class ReconstructESDEventsFromSourceTest(ReconstructESDEventsTest):
@@ -293,7 +311,8 @@ class ReconstructESDCoincidencesTest(unittest.TestCase):
         self.rec.prepare_output()
         self.data.create_table.assert_called_once_with(
             self.rec.coincidences_group, sentinel.destination,
-            reconstructions.ReconstructedCoincidence, expectedrows=sentinel.nrows)
+            reconstructions.ReconstructedCoincidence, expectedrows=sentinel.nrows,
+            filters=reconstructions.FILTERS)
         self.assertEqual(self.rec.reconstructions, self.data.create_table.return_value)
         self.assertEqual(self.rec.reconstructions._v_attrs.cluster, self.cluster)
 
@@ -310,7 +329,8 @@ class ReconstructESDCoincidencesTest(unittest.TestCase):
             self.rec.coincidences_group, sentinel.destination, recursive=True)
         self.data.create_table.assert_called_with(
             self.rec.coincidences_group, sentinel.destination,
-            reconstructions.ReconstructedCoincidence, expectedrows=sentinel.nrows)
+            reconstructions.ReconstructedCoincidence, expectedrows=sentinel.nrows,
+            filters=reconstructions.FILTERS)
         self.assertEqual(self.rec.reconstructions, self.data.create_table.return_value)
         self.assertEqual(self.rec.reconstructions._v_attrs.cluster, self.cluster)
 
@@ -331,14 +351,29 @@ class ReconstructESDCoincidencesTest(unittest.TestCase):
             {'s1': reconstructions.tables.BoolCol(pos=26)})
         self.data.create_table.assert_called_with(
             self.rec.coincidences_group, sentinel.destination, mock_description,
-            expectedrows=sentinel.nrows)
-
-    def test__store_reconstruction(self):
-        coin = MagicMock()
-        self.rec.reconstructions = MagicMock()
-        self.rec._store_reconstruction(coin, sentinel.core_x, sentinel.core_y,
-                                       sentinel.theta, sentinel.phi, [2, 3, 4])
-        self.rec.reconstructions.row.append.assert_called_once_with()
+            expectedrows=sentinel.nrows,
+            filters=reconstructions.FILTERS)
+
+    def test_store_reconstructions(self):
+        keys = ['id', 'ext_timestamp', 'x', 'y', 'zenith', 'azimuth', 'size',
+                'energy']
+        self.rec.coincidences = MagicMock()
+        self.rec.coincidences.read.return_value = array(
+            [(1, 10, 1., 2., .1, .2, 3., 4.)],
+            dtype=[(key, 'f8') for key in keys])
+        self.rec.reconstructions = MagicMock(dtype=dtype(
+            [(key, 'f4') for key in keys] +
+            [('reference_' + key, 'f4') for key in keys[2:]] +
+            [('s%d' % number, '?') for number in range(1, 5)]))
+        self.rec.station_numbers = [[2, 3, 4]]
+        self.rec.store_reconstructions()
+        rows = self.rec.reconstructions.append.call_args[0][0]
+        self.assertEqual(list(rows['id']), [1])
+        self.assertEqual(list(rows['reference_energy']), [4.])
+        self.assertTrue(isnan(rows['x'][0]))
+        self.assertEqual([rows['s%d' % number][0] for number in range(1, 5)],
+                         [False, True, True, True])
+        self.rec.reconstructions.flush.assert_called_once_with()
 
 
 class ReconstructESDCoincidencesFromSourceTest(ReconstructESDCoincidencesTest):
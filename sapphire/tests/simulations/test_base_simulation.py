@@ -190,34 +190,37 @@ class BaseSimulationTest(unittest.TestCase):
         station_groups = MagicMock()
         self.simulation.station_groups = station_groups
         table = station_groups.__getitem__.return_value.events
-        table.nrows = 123
+        self.simulation._event_counts = [0, 123]
+        self.simulation._last_event_timestamps = [None, None]
 
         observables = {'key1': 1., 'key2': 2.}
-        table.colnames = ['key1', 'key2']
-        idx = self.simulation.store_station_observables(
-            sentinel.station_id, observables)
+        self.simulation._events_colnames = frozenset(['key1', 'key2'])
+        idx = self.simulation.store_station_observables(1, observables)
 
         # tests
-        station_groups.__getitem__.assert_called_once_with(sentinel.station_id)
+        station_groups.__getitem__.assert_called_once_with(1)
 
-        calls = [call('event_id', table.nrows), call('key2', 2.),
+        calls = [call('event_id', 123), call('key2', 2.),
                  call('key1', 1.)]
         station_groups.asser_has_calls(calls, any_order=True)
         table.row.append.assert_called_once_with()
-        table.flush.assert_called_once_with()
-        self.assertEqual(idx, table.nrows - 1)
+        self.assertFalse(table.flush.called)
+        self.assertEqual(idx, 123)
+        self.assertEqual(self.simulation._event_counts, [0, 124])
+        self.assertEqual(self.simulation._last_event_timestamps[1],
+                         3 * (table.row.__getitem__.return_value,))
 
     def test_store_station_observables_raises_warning(self):
         station_groups = MagicMock()
         self.simulation.station_groups = station_groups
-        table = station_groups.__getitem__.return_value.events
+        self.simulation._event_counts = [0]
+        self.simulation._last_event_timestamps = [None]
         observables = {'key1': 1., 'key2': 2.}
-        table.colnames = ['key1']
+        self.simulation._events_colnames = frozenset(['key1'])
 
         with warnings.catch_warnings(record=True) as warned:
             warnings.simplefilter('always')
-            self.simulation.store_station_observables(sentinel.station_id,
-                                                      observables)
+            self.simulation.store_station_observables(0, observables)
         self.assertEqual(len(warned), 1)
 
     @unittest.skip("WIP")
@@ -43,6 +43,8 @@ class HiSPARCSimulationTest(unittest.TestCase):
         self.assertEqual(self.simulation.simulate_adc_sampling(1.25), 2.5)
         self.assertEqual(self.simulation.simulate_adc_sampling(2.5), 2.5)
         self.assertEqual(self.simulation.simulate_adc_sampling(4), 5.)
+        self.assertEqual(list(self.simulation.simulate_adc_sampling(np.array([0, 0.1, 4]))),
+                         [0, 2.5, 5.])
 
     def test_simulate_signal_transport_time(self):
         self.assertEqual(list(self.simulation.simulate_signal_transport_time()),
@@ -81,16 +83,49 @@ class HiSPARCSimulationTest(unittest.TestCase):
         assert_almost_equal(x, 59.85605947801825)
         assert_almost_equal(y, 317.2896993591305)
 
+    def test_generate_core_positions(self):
+        x, y = self.simulation.generate_core_positions(500, 3)
+        assert_almost_equal(x, [104.26705219, -256.37794085, -4.47229451])
+        assert_almost_equal(y, [-305.58776645, -338.15894902, -2.93126016])
+        x, y = self.simulation.generate_core_positions(500, 10000)
+        self.assertTrue((np.hypot(x, y) <= 500).all())
+
     def test_generate_azimuth(self):
         self.assertEqual(self.simulation.generate_azimuth(),
                          -0.521366120872004)
 
+    def test_generate_azimuths(self):
+        assert_almost_equal(self.simulation.generate_azimuths(3),
+                            [-0.521366120872004, 1.3843396200075526, -3.1408740154179404])
+
+    def test_generate_zeniths(self):
+        assert_almost_equal(self.simulation.generate_zeniths(3),
+                            [0.8300124420104884, 0.5660577221205172, 1.1125762740671532])
+
+    def test_generate_attenuated_zeniths(self):
+        assert_almost_equal(self.simulation.generate_attenuated_zeniths(3),
+                            [0.36317461027406217, 0.5495305858010073, 0.005347448305383333])
+
+    def test_inverse_zenith_probabilities(self):
+        p = np.array([0., 0.5, 1.])
+        assert_almost_equal(self.simulation.inverse_zenith_probabilities(p),
+                            [self.simulation.inverse_zenith_probability(x) for x in p])
+
     def test_generate_energy(self):
         self.assertEqual(self.simulation.generate_energy(), 136117213526167.64)
         io = 1e17
         assert_almost_equal(self.simulation.generate_energy(io, io) / io, 1.)
         self.assertEqual(self.simulation.generate_energy(alpha=-3), 100005719231473.97)
 
+    def test_generate_energies(self):
+        assert_almost_equal(self.simulation.generate_energies(3) / 1e13,
+                            [1.36117213, 2.07108282, 1.00006536])
+        energies = self.simulation.generate_energies(10000, 1e15, 1e17, 3e15)
+        self.assertTrue((energies >= 1e15).all())
+        self.assertTrue((energies <= 1e17).all())
+        io = 1e17
+        assert_almost_equal(self.simulation.generate_energies(2, io, io) / io, [1., 1.])
+
 
 class ErrorlessSimulationTest(HiSPARCSimulationTest):
 
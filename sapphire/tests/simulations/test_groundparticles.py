@@ -4,8 +4,8 @@ import unittest
 import six
 import tables
 
-from mock import Mock, sentinel
-from numpy import arange, pi, random, sqrt, testing
+from mock import Mock, patch, sentinel
+from numpy import arange, exp, pi, random, sqrt, testing, zeros
 
 from sapphire.clusters import SingleDiamondStation
 from sapphire.simulations import groundparticles
@@ -179,6 +179,50 @@ class FixedCoreDistanceSimulationTest(unittest.TestCase):
         testing.assert_allclose(sqrt(x ** 2 + y ** 2), r, 1e-11)
 
 
+class GroundParticlesGEANT4SimulationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.simulation = groundparticles.GroundParticlesGEANT4Simulation.__new__(
+            groundparticles.GroundParticlesGEANT4Simulation)
+        self.simulation.corsikafile = Mock()
+
+    def test__simulateTrace(self):
+        """Compare the convolved trace to the sum of the individual pulses"""
+
+        n_electrons = [0, 3, 0, 0, 12, 1, 0, 5] + [0] * 72
+        t_rise, t_fall, gain, resistance = 7., 25., 17e6, 50.
+        with patch.object(groundparticles.np.random, 'normal') as mock_normal:
+            mock_normal.side_effect = lambda mean, sigma: mean + 0 * sigma
+            trace = self.simulation._simulateTrace(n_electrons)
+
+        expected = zeros(len(n_electrons))
+        t = 2.5 * arange(len(n_electrons))
+        for k, n in enumerate(n_electrons):
+            dt = t[k:] - t[k]
+            amplitude = gain * resistance * n * 1.6e-19 / ((t_fall - t_rise) * 1e-9)
+            expected[k:] += amplitude * (exp(-dt / t_rise) - exp(-dt / t_fall))
+        testing.assert_allclose(trace, expected, rtol=1e-12, atol=0)
+
+    def test__simulate_PMT(self):
+        """Photons are binned per 2.5 ns between 0 and 200 ns"""
+
+        sim = self.simulation
+        self.assertEqual(len(sim._simulate_PMT([3., 50., 120.])), 80)
+        testing.assert_equal(sim._simulate_PMT([]), [0])
+
+        # Pass the number of photons per bin through as the trace
+        sim._simulateCathode = Mock(side_effect=lambda n_photons: n_photons)
+        sim._simulateTrace = Mock(side_effect=lambda n_electrons: n_electrons)
+        photontimes = [-1., 0., 1., 2.5, 100., 199.9, 200., 200.1, 300.]
+        trace = sim._simulate_PMT(photontimes)
+        expected = zeros(80)
+        expected[0] = 2
+        expected[1] = 1
+        expected[40] = 1
+        expected[79] = 2
+        testing.assert_equal(trace, expected)
+
+
 class MultipleGroundParticlesSimulationTest(unittest.TestCase):
 
     def setUp(self):
@@ -1,14 +1,17 @@
 import os
 import unittest
 
+from tempfile import mkdtemp
+
 import tables
 
 from mock import ANY, MagicMock, patch, sentinel
 
 from sapphire import api, esd
-from sapphire.tests.esd_load_data import (create_tempfile_path, perform_download_coincidences,
-                                          perform_esd_download_data, perform_load_coincidences,
-                                          perform_load_data, test_data_coincidences_path, test_data_path)
+from sapphire.tests.esd_load_data import (coincidences_source, create_tempfile_path,
+                                          perform_download_coincidences, perform_esd_download_data,
+                                          perform_load_coincidences, perform_load_data,
+                                          test_data_coincidences_path, test_data_path)
 from sapphire.tests.validate_results import validate_results
 
 
@@ -41,7 +44,8 @@ class ESDTest(unittest.TestCase):
         result = esd._create_events_table(file, sentinel.group)
         file.create_table.assert_called_once_with(sentinel.group, 'events',
                                                   description,
-                                                  createparents=True)
+                                                  createparents=True,
+                                                  filters=esd.FILTERS)
         self.assertEqual(result, file.create_table.return_value)
 
     def test_create_weather_table(self):
@@ -65,7 +69,8 @@ class ESDTest(unittest.TestCase):
         result = esd._create_weather_table(file, sentinel.group)
         file.create_table.assert_called_once_with(sentinel.group, 'weather',
                                                   description,
-                                                  createparents=True)
+                                                  createparents=True,
+                                                  filters=esd.FILTERS)
         self.assertEqual(result, file.create_table.return_value)
 
     def test_create_singles_table(self):
@@ -83,7 +88,8 @@ class ESDTest(unittest.TestCase):
         result = esd._create_singles_table(file, sentinel.group)
         file.create_table.assert_called_once_with(sentinel.group, 'singles',
                                                   description,
-                                                  createparents=True)
+                                                  createparents=True,
+                                                  filters=esd.FILTERS)
         self.assertEqual(result, file.create_table.return_value)
 
     def test__first_available_numbered_path(self):
@@ -97,6 +103,18 @@ class ESDTest(unittest.TestCase):
         self.assertEqual(esd._first_available_numbered_path(), 'data2.h5')
         os.remove('data1.h5')
 
+    def test__first_available_numbered_path_in_directory(self):
+        """Check if a free path in the given directory is returned"""
+
+        directory = mkdtemp()
+        self.assertEqual(esd._first_available_numbered_path(directory),
+                         os.path.join(directory, 'data1.h5'))
+        open(os.path.join(directory, 'data1.h5'), 'a').close()
+        self.assertEqual(esd._first_available_numbered_path(directory),
+                         os.path.join(directory, 'data2.h5'))
+        os.remove(os.path.join(directory, 'data1.h5'))
+        os.rmdir(directory)
+
     def test_unsupported_type(self):
         """Check for Exception for unsupported data types"""
 
@@ -129,6 +147,30 @@ class ESDTest(unittest.TestCase):
         validate_results(self, test_data_coincidences_path, output_path)
         os.remove(output_path)
 
+    @patch.object(esd.api, 'Network', side_effect=StaleNetwork)
+    def test_load_coincidences_interrupted(self, mock_esd_api_network):
+        """Events referred to by c_index are stored if loading fails"""
+
+        with open(coincidences_source) as source:
+            lines = source.readlines()
+        tsv_path = create_tempfile_path()
+        with open(tsv_path, 'w') as tsv:
+            # Header and the first coincidences, then a corrupt line
+            tsv.writelines(lines[:-12])
+            tsv.write('corrupt\n')
+        output_path = create_tempfile_path()
+        with tables.open_file(output_path, 'w') as data:
+            self.assertRaises(ValueError, esd.load_coincidences, data, tsv_path)
+            c_index = data.root.coincidences.c_index
+            s_index = data.root.coincidences.s_index
+            self.assertTrue(len(c_index))
+            for c_idx in c_index:
+                for s_idx, e_idx in c_idx:
+                    events = data.get_node(s_index[s_idx].decode(), 'events')
+                    self.assertLess(e_idx, len(events))
+        os.remove(tsv_path)
+        os.remove(output_path)
+
     @patch.object(esd, 'download_data')
     @patch.object(tables, 'open_file')
     def test_quick_download(self, mock_open_file, mock_download_data):